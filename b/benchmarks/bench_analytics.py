@@ -0,0 +1,110 @@
+"""Member analytics snapshot and aggregation time on a synthetic guild.
+
+Run from the b/ directory: python benchmarks/bench_analytics.py [members] [snapshots]
+
+"snapshot" is building the arrays from member objects (worker thread, once per interval), "save" is
+writing the compressed file. "report" is everything $stats computes across all snapshots: churn
+between each pair, cohort retention, role histogram and account ages. It is compared with the same
+churn, retention and role counts written as Python loops over the member list.
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from types import SimpleNamespace
+from datetime import datetime, timezone
+
+os.environ.setdefault("SERVERBOT_DATA_DIR", tempfile.mkdtemp(prefix="serverbot-bench-"))
+os.environ.setdefault("SERVERBOT_LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot import MemberAnalytics, MemberSnapshot, cohort_retention, member_churn
+
+DAY = 86400
+
+
+def make_members(count, now, rng):
+    roles = [1348500000000000000 + i for i in range(60)]
+    return [
+        SimpleNamespace(
+            id=1100000000000000000 + i,
+            joined_at=datetime.fromtimestamp(now - rng.random() * 365 * DAY, timezone.utc),
+            created_at=datetime.fromtimestamp(now - rng.random() * 8 * 365 * DAY, timezone.utc),
+            bot=rng.random() < 0.01,
+            _roles=rng.sample(roles, rng.randint(0, 5)),
+        )
+        for i in range(count)
+    ]
+
+
+def python_loops(first_members, latest_members, now):
+    first_ids = {member.id for member in first_members}
+    latest_ids = {member.id for member in latest_members}
+    joined = sum(1 for member_id in latest_ids if member_id not in first_ids)
+    left = sum(1 for member_id in first_ids if member_id not in latest_ids)
+
+    sizes, kept = Counter(), Counter()
+    for member in first_members:
+        cohort = int((now - member.joined_at.timestamp()) // (7 * DAY))
+        if cohort < 8:
+            sizes[cohort] += 1
+            kept[cohort] += member.id in latest_ids
+
+    roles = Counter(role_id for member in latest_members for role_id in member._roles)
+    return joined, left, roles.most_common(10)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+    snapshots = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    rng = random.Random(1)
+    now = time.time()
+
+    members = make_members(count, now - snapshots * DAY, rng)
+    analytics = MemberAnalytics(tempfile.mkdtemp(prefix="serverbot-analytics-"))
+    first_members = members
+    next_id = 1100000000000000000 + count
+
+    for day in range(snapshots):
+        # About 1% of members leave and the same number join between snapshots
+        if day:
+            members = [member for member in members if rng.random() >= 0.01]
+            joins = count - len(members)
+            members += make_members(joins, now, rng)
+            for member in members[-joins:]:
+                member.id = next_id
+                next_id += 1
+
+        start = time.perf_counter()
+        snapshot = MemberSnapshot.from_members(1, members, now - (snapshots - day) * DAY)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        analytics.record(snapshot)
+        saved = time.perf_counter() - start
+
+    path = analytics.snapshot_paths(1)[-1]
+    print(f"{count:,} members, {snapshots} snapshots")
+    print(f"  snapshot              {built * 1000:10.1f} ms")
+    print(f"  save                  {saved * 1000:10.1f} ms ({os.path.getsize(path) / 1024 / 1024:.1f} MiB per snapshot)")
+
+    start = time.perf_counter()
+    report = analytics.report(1, snapshots + 1, now)
+    print(f"  report                {(time.perf_counter() - start) * 1000:10.1f} ms (joined {report['joined']:,}, left {report['left']:,})")
+
+    first = MemberSnapshot.load(1, analytics.snapshot_paths(1)[0])
+    latest = MemberSnapshot.load(1, path)
+    start = time.perf_counter()
+    member_churn(first.ids, latest.ids)
+    cohort_retention(first, latest)
+    latest.role_histogram()
+    print(f"  arrays, first/latest  {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+    start = time.perf_counter()
+    python_loops(first_members, members, first.taken_at)
+    print(f"  python loops          {(time.perf_counter() - start) * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
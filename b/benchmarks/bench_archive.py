@@ -0,0 +1,72 @@
+"""Message archive ingest throughput, write amplification and range read time.
+
+Run from the b/ directory: python benchmarks/bench_archive.py [events]
+
+"enqueue" is what the event loop pays per record, "ingest" is the rate at which the writer thread
+gets records onto disk. Write amplification is bytes written (block headers, compressed payload
+and index entries) divided by the raw JSON size of the records.
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SERVERBOT_DATA_DIR", tempfile.mkdtemp(prefix="serverbot-bench-"))
+os.environ.setdefault("SERVERBOT_LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot import MessageArchive
+
+
+def make_records(count):
+    rng = random.Random(1)
+    vocabulary = ["".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(2, 9))) for _ in range(3000)]
+    start = time.time() - count
+    return [
+        {
+            "ts": start + i,
+            "type": "delete" if i % 2 else "edit",
+            "guild_id": 1348508925607018000,
+            "channel_id": 1348509943203889000 + rng.randrange(50),
+            "message_id": 1400000000000000000 + i,
+            "author_id": 1300000000000000000 + rng.randrange(2000),
+            "author_name": rng.choice(vocabulary),
+            "content": " ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 40))),
+            "attachments": [],
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    records = make_records(count)
+
+    for batch_records in (100, 1000):
+        archive = MessageArchive(tempfile.mkdtemp(prefix="serverbot-archive-"), batch_records=batch_records, flush_seconds=1)
+        archive.start()
+
+        start = time.perf_counter()
+        for record in records:
+            archive.append(record)
+        enqueued = time.perf_counter() - start
+        archive.stop()
+        total = time.perf_counter() - start
+
+        stats = archive.stats
+        print(f"batch of {batch_records} records")
+        print(f"  enqueue               {enqueued / count * 1e6:10.2f} us/event")
+        print(f"  ingest                {count / total:10,.0f} events/sec")
+        print(f"  write amplification   {stats['written_bytes'] / stats['raw_bytes']:10.3f}x ({stats['blocks']} blocks)")
+
+        # Read back one hour from the middle of the archive
+        middle = records[count // 2]["ts"]
+        start = time.perf_counter()
+        found = archive.read_range(middle, middle + 3600)
+        print(f"  read 1h range         {(time.perf_counter() - start) * 1000:10.2f} ms ({len(found)} records)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Automod throughput in messages/sec as the number of rules grows.
+
+Plain words are a set lookup and should stay flat however many there are. Custom regexes share
+one alternation, which Python's re still tries branch by branch, so they do scale with their count,
+which is why a guild can have at most AUTOMOD_MAX_REGEXES of them.
+
+Run from the b/ directory: python benchmarks/bench_automod.py [messages]
+
+Messages go through AutoMod.check_message, the same path on_message uses (content rules,
+mention count, flood and duplicate windows), without touching Discord.
+"""
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SERVERBOT_DATA_DIR", tempfile.mkdtemp(prefix="serverbot-bench-"))
+os.environ.setdefault("SERVERBOT_LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bot
+from bot import AUTOMOD_MAX_REGEXES, DEFAULT_GUILD_CONFIG, AutoMod, AutoModMatcher
+
+
+class FakeGuild:
+    id = 1
+
+
+class FakeAuthor:
+    def __init__(self, user_id):
+        self.id = user_id
+
+
+class FakeMessage:
+    guild = FakeGuild()
+    raw_role_mentions = []
+    mention_everyone = False
+
+    def __init__(self, content, user_id, mentions):
+        self.content = content
+        self.author = FakeAuthor(user_id)
+        self.raw_mentions = mentions
+
+
+def random_word(rng, length):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def make_messages(rng, count, words):
+    vocabulary = [random_word(rng, rng.randint(3, 9)) for _ in range(2000)]
+    messages = []
+    for i in range(count):
+        tokens = [rng.choice(vocabulary) for _ in range(rng.randint(3, 30))]
+        # A few percent of messages break a rule
+        roll = rng.random()
+        if roll < 0.02 and words:
+            tokens.insert(rng.randrange(len(tokens) + 1), rng.choice(words))
+        elif roll < 0.03:
+            tokens.append("discord.gg/" + random_word(rng, 8))
+        mentions = list(range(8)) if roll > 0.995 else []
+        messages.append(FakeMessage(" ".join(tokens), rng.randrange(5000), mentions))
+    return messages
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = random.Random(1)
+
+    print(f"{'words':>6} {'regexes':>8} {'msgs/sec':>12} {'us/msg':>8} {'flagged':>8}")
+    for word_count, regex_count in ((0, 0), (100, 0), (1000, 0), (10000, 0), (100, 10), (100, AUTOMOD_MAX_REGEXES)):
+        words = [random_word(rng, rng.randint(4, 10)) for _ in range(word_count)]
+        regexes = [f"{random_word(rng, 4)}\\s*[0-9]+{random_word(rng, 3)}" for _ in range(regex_count)]
+        settings = dict(DEFAULT_GUILD_CONFIG, automod_words=words, automod_regexes=regexes)
+
+        cog = AutoMod(None)
+        cog.matchers[FakeGuild.id] = (bot.guild_config.version, AutoModMatcher(settings))
+        messages = make_messages(rng, count, words)
+
+        start = time.perf_counter()
+        flagged = 0
+        for i, message in enumerate(messages):
+            if cog.check_message(message, settings, i * 0.01):
+                flagged += 1
+        elapsed = time.perf_counter() - start
+
+        print(f"{word_count:>6} {regex_count:>8} {count / elapsed:>12,.0f} {elapsed / count * 1e6:>8.2f} {flagged:>8}")
+
+
+if __name__ == "__main__":
+    main()
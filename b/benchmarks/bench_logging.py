@@ -0,0 +1,89 @@
+"""Per-event cost of the queued JSON logger compared with the old print() calls.
+
+Run from the b/ directory: python benchmarks/bench_logging.py [events]
+
+Only the time spent in the calling thread is measured, that is what the event loop pays.
+print() is measured against a fast local file and against a sink that stalls on every write,
+like stdout attached to a full pipe or a busy journal.
+"""
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import tempfile
+import time
+
+# Keep the bot's own log files out of the working tree
+os.environ.setdefault("SERVERBOT_DATA_DIR", tempfile.mkdtemp(prefix="serverbot-bench-"))
+os.environ.setdefault("SERVERBOT_LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot import DeferredQueueHandler, JsonLogFormatter
+
+
+# Stand-in for a pipe whose reader is falling behind
+class SlowSink:
+    def __init__(self, delay):
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def bench(label, func, events):
+    start = time.perf_counter()
+    for i in range(events):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {elapsed / events * 1e6:8.2f} us/event", file=sys.__stdout__)
+
+
+def main():
+    events = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    out_dir = tempfile.mkdtemp(prefix="serverbot-bench-")
+    slow_sink = SlowSink(0.0005)
+
+    with open(os.path.join(out_dir, "print.log"), "w", encoding="utf-8") as f:
+        bench("print() to file (old)", lambda i: print(f"Parsing event timestamp: 2025-01-01T00:00:{i % 60:02d}Z", file=f, flush=True), events)
+    bench("print() to slow pipe (old)", lambda i: print(f"Parsing event timestamp: 2025-01-01T00:00:{i % 60:02d}Z", file=slow_sink, flush=True), events // 100)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(out_dir, "queued.log"), maxBytes=5 * 1024 * 1024, backupCount=2, encoding="utf-8"
+    )
+    file_handler.setFormatter(JsonLogFormatter())
+    slow_handler = logging.StreamHandler(slow_sink)
+    slow_handler.setFormatter(JsonLogFormatter())
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler)
+    slow_queue = queue.SimpleQueue()
+    slow_listener = logging.handlers.QueueListener(slow_queue, slow_handler)
+
+    logger = logging.getLogger("serverbot.bench")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    logger.addHandler(DeferredQueueHandler(log_queue))
+
+    listener.start()
+    bench("log.debug() (filtered out)", lambda i: logger.debug("Parsing event timestamp %s", i), events)
+    bench("log.info() (queued)", lambda i: logger.info("Parsing event timestamp %s", i), events)
+    bench("log.info(extra=...) (queued)", lambda i: logger.info("Error fetching events", extra={"repo": "ServerBot", "status": 500}), events)
+
+    start = time.perf_counter()
+    listener.stop()
+    print(f"{'writer thread drain':<32} {time.perf_counter() - start:8.3f} s", file=sys.__stdout__)
+
+    # Same logger, now feeding the stalling sink from the writer thread
+    logger.handlers.clear()
+    logger.addHandler(DeferredQueueHandler(slow_queue))
+    slow_listener.start()
+    bench("log.info() to slow pipe (queued)", lambda i: logger.info("Parsing event timestamp %s", i), events // 100)
+    slow_listener.stop()
+
+
+if __name__ == "__main__":
+    main()
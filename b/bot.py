@@ -5,7 +5,29 @@ import json
 import requests
 import platform
 import psutil
+import numpy as np
 import sys
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+import struct
+import zlib
+import mmap
+import io
+import glob
+import functools
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import re
+import heapq
+import sqlite3
+import time
+import itertools
+from typing import Optional
+from bisect import bisect_right
+from collections import OrderedDict, deque
 from discord.ext import commands, tasks
 from discord import Embed, ButtonStyle, Activity, ActivityType, Status
 from discord.ui import View, Button
@@ -17,27 +39,541 @@ import asyncio
 WELCOME_CHANNEL_ID = 1348509943203889172
 GITHUB_UPDATES_CHANNEL_ID = 1348508925607018547
 
+# Where runtime state (guild settings etc.) is kept, outside the source files
+DATA_DIR = os.environ.get("SERVERBOT_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"))
+GUILD_CONFIG_FILE = os.path.join(DATA_DIR, "guild_config.json")
+LOCKDOWN_STATE_FILE = os.path.join(DATA_DIR, "lockdown_state.json")
+PUNISHMENTS_DB = os.path.join(DATA_DIR, "punishments.db")
+COMMAND_TREE_HASH_FILE = os.path.join(DATA_DIR, "command_tree.hash")
+
+# Message archive: "off", "edits" (deleted and edited messages) or "all" (every message too)
+ARCHIVE_MODE = os.environ.get("SERVERBOT_ARCHIVE", "off").lower()
+ARCHIVE_DIR = os.environ.get("SERVERBOT_ARCHIVE_DIR", os.path.join(DATA_DIR, "archive"))
+ARCHIVE_SEGMENT_BYTES = int(os.environ.get("SERVERBOT_ARCHIVE_SEGMENT_BYTES", 64 * 1024 * 1024))
+ARCHIVE_BATCH_RECORDS = int(os.environ.get("SERVERBOT_ARCHIVE_BATCH_RECORDS", 1000))
+ARCHIVE_FLUSH_SECONDS = float(os.environ.get("SERVERBOT_ARCHIVE_FLUSH_SECONDS", 2))
+
+# Member analytics snapshots, one file per guild every interval, the oldest are removed past the limit
+ANALYTICS_DIR = os.environ.get("SERVERBOT_ANALYTICS_DIR", os.path.join(DATA_DIR, "analytics"))
+ANALYTICS_INTERVAL_HOURS = float(os.environ.get("SERVERBOT_ANALYTICS_INTERVAL_HOURS", 6))
+ANALYTICS_MAX_SNAPSHOTS = int(os.environ.get("SERVERBOT_ANALYTICS_MAX_SNAPSHOTS", 240))
+
+# How many channel permission updates run at once during a lockdown
+LOCKDOWN_CONCURRENCY = 5
+
+# Settings used for any guild that has no entry in the config file
+DEFAULT_GUILD_CONFIG = {
+    "prefix": "$",
+    "welcome_channel_id": WELCOME_CHANNEL_ID,
+    "github_updates_channel_id": GITHUB_UPDATES_CHANNEL_ID,
+    "author_name": "GDPM Server Management",
+    "footer": "GDPM Server Management",
+    "mod_log_channel_id": None,
+    "mute_role_id": None,
+    "automod_enabled": False,
+    "automod_words": [],
+    "automod_regexes": [],
+    "automod_block_invites": True,
+    "automod_max_mentions": 5,
+    "automod_flood_messages": 6,
+    "automod_flood_seconds": 5,
+    "automod_duplicate_messages": 3,
+    "automod_duplicate_seconds": 30,
+    "automod_action": "delete",  # delete, timeout or ban
+    "automod_timeout": "10m",
+    "raid_window_seconds": 30,
+    "raid_join_threshold": 10,
+    "raid_young_account_days": 7,
+    "raid_young_threshold": 5,  # 0 disables the account age check
+    "raid_quiet_seconds": 300,  # raid mode ends after this long below the thresholds
+    "raid_lock_channel_ids": [],
+}
+
+# Settings that only accept one of a few values
+SETTING_CHOICES = {
+    "automod_action": ("delete", "timeout", "ban"),
+}
+
+# Settings holding a duration such as 10m
+DURATION_SETTINGS = ("automod_timeout",)
+
+# Allowed (min, max) for numeric settings, anything not listed has to be at least 1
+SETTING_RANGES = {
+    "raid_window_seconds": (1, 3600),
+    "raid_young_account_days": (1, 3650),
+    "raid_young_threshold": (0, None),
+    "raid_quiet_seconds": (30, 86400),
+}
+
 GITHUB_ORG = "GDMPORG"
 GITHUB_API_URL = 'https://api.github.com'
 GITHUB_HEADERS = {'Accept': 'application/vnd.github.v3+json'}
 
+LOG_LEVEL = os.environ.get("SERVERBOT_LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.environ.get("SERVERBOT_LOG_FILE", os.path.join(DATA_DIR, "serverbot.log"))
+LOG_MAX_BYTES = int(os.environ.get("SERVERBOT_LOG_MAX_BYTES", 5 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.environ.get("SERVERBOT_LOG_BACKUP_COUNT", 5))
+
+# Attributes every LogRecord has, anything else was passed through `extra=`
+_LOG_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+# One JSON object per line
+class JsonLogFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.utcfromtimestamp(record.created).isoformat(timespec="milliseconds") + "Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        
+        for key, value in record.__dict__.items():
+            if key not in _LOG_RECORD_FIELDS:
+                entry[key] = value
+        
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        
+        return json.dumps(entry, default=str)
+
+# Queue handler that skips the usual pre-formatting, so the event loop only pays for the enqueue.
+# Log arguments are formatted later on the writer thread, so only pass values that won't be mutated.
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        return record
+
+# Route all logging (ours and discord.py's) through a queue drained by a background thread
+def setup_logging():
+    formatter = JsonLogFormatter()
+    
+    os.makedirs(os.path.dirname(LOG_FILE) or ".", exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        LOG_FILE,
+        maxBytes=LOG_MAX_BYTES,
+        backupCount=LOG_BACKUP_COUNT,
+        encoding="utf-8",
+        delay=True
+    )
+    file_handler.setFormatter(formatter)
+    
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(formatter)
+    
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    
+    # The level is checked before a record is even created, filtered calls cost almost nothing
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    
+    listener.start()
+    atexit.register(listener.stop)
+    
+    return listener
+
+setup_logging()
+log = logging.getLogger("serverbot")
+
+EXECUTOR_THREADS = int(os.environ.get("SERVERBOT_EXECUTOR_THREADS", 8))
+EXECUTOR_PROCESSES = int(os.environ.get("SERVERBOT_EXECUTOR_PROCESSES", 0))  # 0 keeps CPU work on threads
+EXECUTOR_MAX_PENDING = int(os.environ.get("SERVERBOT_EXECUTOR_MAX_PENDING", 64))
+EXECUTOR_TIMEOUT = float(os.environ.get("SERVERBOT_EXECUTOR_TIMEOUT", 30))
+# Event loop stalls longer than this (in seconds) are logged
+LOOP_LAG_WARNING = float(os.environ.get("SERVERBOT_LOOP_LAG_WARNING", 0.05))
+
+# Raised when too much blocking work is already waiting
+class ExecutorBusy(Exception):
+    pass
+
+# Runs blocking calls off the event loop: threads for I/O, an optional process pool for heavy CPU work.
+# Every call gets a timeout, the number of waiting calls is capped and per-task timings are kept.
+class BlockingWorkRunner:
+    def __init__(self, threads=EXECUTOR_THREADS, processes=EXECUTOR_PROCESSES, max_pending=EXECUTOR_MAX_PENDING, timeout=EXECUTOR_TIMEOUT):
+        self.threads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="serverbot-io")
+        self.processes = ProcessPoolExecutor(max_workers=processes) if processes else None
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self.timings = {}  # {task name: [count, total seconds, max seconds]}
+    
+    # The runner's own options start with an underscore, every other keyword goes to `func`.
+    # `_cpu=True` uses the process pool when there is one, the function and arguments must then be picklable.
+    # A timed out call stops being waited on, but a thread that is already running can't be interrupted,
+    # so it keeps counting towards the pending cap until it really finishes.
+    async def run(self, func, *args, _cpu=False, _timeout=None, _name=None, **kwargs):
+        if self.pending >= self.max_pending:
+            raise ExecutorBusy(f"{self.pending} blocking tasks already pending")
+        
+        executor = self.processes if _cpu and self.processes else self.threads
+        name = _name or getattr(func, "__name__", "task")
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        
+        future = loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+        self.pending += 1
+        
+        def finished(_):
+            self.pending -= 1
+            elapsed = time.perf_counter() - start
+            timing = self.timings.setdefault(name, [0, 0.0, 0.0])
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2] = max(timing[2], elapsed)
+        
+        future.add_done_callback(finished)
+        # Shielded so a timeout doesn't mark the call done while its thread is still busy
+        return await asyncio.wait_for(asyncio.shield(future), _timeout or self.timeout)
+
+blocking_work = BlockingWorkRunner()
+
+# Measures how late the event loop wakes up from short sleeps, anything over the interval is time a handler held it
+class LoopLagMonitor:
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.task = None
+    
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+    
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.last_lag = max(loop.time() - start - self.interval, 0.0)
+            self.max_lag = max(self.max_lag, self.last_lag)
+            if self.last_lag > LOOP_LAG_WARNING:
+                log.warning("Event loop was blocked", extra={"lag_ms": round(self.last_lag * 1000, 1)})
+
+loop_lag_monitor = LoopLagMonitor()
+
+# Longest duration accepted for timeouts, mutes and tempbans (10 years, in seconds)
+MAX_DURATION = 10 * 365 * 86400
+
+# Parse a time string (e.g., "1h", "30m", "1d") into seconds, None if invalid
+def parse_duration(time):
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    
+    try:
+        if time[-1:] in units:
+            duration = int(time[:-1]) * units[time[-1]]
+        else:
+            duration = int(time)
+    except ValueError:
+        return None
+    
+    # Anything longer could not be turned into a date
+    if duration > MAX_DURATION:
+        return None
+    return duration
+
+# Check a setting value (as stored in the config file), raises ValueError with a message for the user
+def validate_setting(key, value):
+    if key not in DEFAULT_GUILD_CONFIG:
+        raise ValueError(f"Unknown setting. Valid settings: {', '.join(DEFAULT_GUILD_CONFIG)}")
+    
+    default = DEFAULT_GUILD_CONFIG[key]
+    is_int = isinstance(value, int) and not isinstance(value, bool)
+    
+    if key.endswith("_id"):
+        if value is not None and not is_int:
+            raise ValueError(f"{key} must be an ID.")
+    elif isinstance(default, bool):
+        if not isinstance(value, bool):
+            raise ValueError(f"{key} must be true or false.")
+    elif isinstance(default, int):
+        if not is_int:
+            raise ValueError(f"{key} must be a whole number.")
+        minimum, maximum = SETTING_RANGES.get(key, (1, None))
+        if value < minimum or (maximum is not None and value > maximum):
+            limits = f"between {minimum} and {maximum}" if maximum is not None else f"at least {minimum}"
+            raise ValueError(f"{key} must be {limits}.")
+    elif key in SETTING_CHOICES:
+        if value not in SETTING_CHOICES[key]:
+            raise ValueError(f"{key} must be one of: {', '.join(SETTING_CHOICES[key])}.")
+    elif key in DURATION_SETTINGS:
+        duration = parse_duration(value) if isinstance(value, str) else None
+        if duration is None or duration <= 0:
+            raise ValueError("Invalid time format. Use format like 30s, 5m, 2h, 1d.")
+    elif isinstance(default, list):
+        item_type = int if key.endswith("_ids") else str
+        if not isinstance(value, list) or not all(isinstance(item, item_type) and not isinstance(item, bool) for item in value):
+            raise ValueError(f"{key} must be a list of {'IDs' if item_type is int else 'text'}.")
+    elif not isinstance(value, str) or not value:
+        raise ValueError(f"{key} must be some text.")
+    
+    return value
+
+# Turn the text given to `$config set` into a setting value, raises ValueError with a message for the user
+def parse_setting(key, text):
+    if key not in DEFAULT_GUILD_CONFIG:
+        raise ValueError(f"Unknown setting. Valid settings: {', '.join(DEFAULT_GUILD_CONFIG)}")
+    
+    default = DEFAULT_GUILD_CONFIG[key]
+    
+    # Channel and role settings are stored as IDs, "none" disables them
+    if key.endswith("_id"):
+        if text.lower() == "none":
+            return None
+        try:
+            return int(text.strip("<#@&>"))
+        except ValueError:
+            raise ValueError("Invalid ID.")
+    elif isinstance(default, bool):
+        return text.lower() in ("true", "on", "yes", "1")
+    elif isinstance(default, int):
+        try:
+            value = int(text)
+        except ValueError:
+            raise ValueError("Please provide a whole number.")
+    elif key in SETTING_CHOICES:
+        value = text.lower()
+    else:
+        value = text
+    
+    return validate_setting(key, value)
+
+# Per-guild settings, loaded from disk once and served from memory
+class GuildConfigStore:
+    def __init__(self, path):
+        self.path = path
+        self.cache = {}  # {guild_id: {setting: value}}
+        self.mtime = None
+        # Bumped on every (re)load so dependents can tell when to rebuild derived state
+        self.version = 0
+        self.load()
+
+    # Returns False when the file couldn't be used and the previous settings were kept
+    def load(self):
+        mtime = None
+        try:
+            mtime = os.stat(self.path).st_mtime
+            with open(self.path, "r", encoding="utf-8") as f:
+                cache = self.parse(json.load(f))
+        except FileNotFoundError:
+            cache = {}
+            mtime = None
+        except (OSError, ValueError) as e:
+            # Keep serving the previous settings rather than dropping to defaults.
+            # Remember the mtime anyway so a broken file is reported once, not on every check.
+            log.error("Error loading guild config", extra={"path": self.path, "error": str(e)})
+            self.mtime = mtime
+            return False
+
+        # Swap in one assignment so lookups never see a half-built cache
+        self.mtime = mtime
+        self.cache = cache
+        self.version += 1
+        return True
+
+    # Build the cache from the file contents, raises ValueError if anything has the wrong shape
+    @staticmethod
+    def parse(raw):
+        if not isinstance(raw, dict):
+            raise ValueError("the file must hold an object of guild IDs")
+        
+        cache = {}
+        for guild_id, settings in raw.items():
+            try:
+                guild_id = int(guild_id)
+            except ValueError:
+                raise ValueError(f"{guild_id!r} is not a guild ID")
+            if not isinstance(settings, dict):
+                raise ValueError(f"the settings of guild {guild_id} must be an object")
+            
+            merged = dict(DEFAULT_GUILD_CONFIG)
+            for key, value in settings.items():
+                if key not in DEFAULT_GUILD_CONFIG:
+                    log.warning("Ignoring unknown guild setting", extra={"guild_id": guild_id, "setting": key})
+                    continue
+                try:
+                    merged[key] = validate_setting(key, value)
+                except ValueError as e:
+                    raise ValueError(f"guild {guild_id}: {e}")
+            cache[guild_id] = merged
+        return cache
+
+    def reload_if_changed(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            mtime = None
+
+        if mtime != self.mtime:
+            return self.load()
+        return False
+
+    def get(self, guild_id):
+        return self.cache.get(guild_id, DEFAULT_GUILD_CONFIG)
+
+    def set(self, guild_id, key, value):
+        settings = dict(self.get(guild_id))
+        settings[key] = value
+        self.cache = {**self.cache, guild_id: settings}
+        self.version += 1
+        self.save()
+
+    def save(self):
+        # Only store values that differ from the defaults
+        raw = {}
+        for guild_id, settings in self.cache.items():
+            overrides = {k: v for k, v in settings.items() if DEFAULT_GUILD_CONFIG.get(k) != v}
+            if overrides:
+                raw[str(guild_id)] = overrides
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(raw, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self.mtime = os.stat(self.path).st_mtime
+
+guild_config = GuildConfigStore(GUILD_CONFIG_FILE)
+
+# Shortcut for the settings of a guild (DMs get the defaults)
+def guild_settings(guild):
+    if guild is None:
+        return DEFAULT_GUILD_CONFIG
+    return guild_config.get(guild.id)
+
+# Resolve the command prefix per message from the cached settings
+def get_prefix(bot, message):
+    return guild_settings(message.guild)["prefix"]
+
 intents = discord.Intents.all()
 intents.members = True
 intents.message_content = True
 
-bot = commands.Bot(command_prefix='$', intents=intents)
+bot = commands.Bot(command_prefix=get_prefix, intents=intents)
 bot.remove_command("help")
 
+# Time-to-ack (first response or defer) and time-to-result (command finished) per command
+class CommandTimings:
+    def __init__(self):
+        self.timings = {}  # {command name: [count, total ack, max ack, total result, max result]}
+    
+    def start(self, ctx):
+        ctx.timing_started = time.perf_counter()
+        ctx.timing_acknowledged = None
+    
+    def acknowledge(self, ctx):
+        if ctx.timing_acknowledged is None:
+            ctx.timing_acknowledged = time.perf_counter()
+    
+    def finish(self, ctx):
+        if not hasattr(ctx, "timing_started"):
+            return
+        
+        finished = time.perf_counter()
+        # Commands that answer in one go are acknowledged by their result
+        ack = (ctx.timing_acknowledged or finished) - ctx.timing_started
+        result = finished - ctx.timing_started
+        
+        timing = self.timings.setdefault(ctx.command.qualified_name, [0, 0.0, 0.0, 0.0, 0.0])
+        timing[0] += 1
+        timing[1] += ack
+        timing[2] = max(timing[2], ack)
+        timing[3] += result
+        timing[4] = max(timing[4], result)
+        log.debug("Command finished", extra={"command": ctx.command.qualified_name, "slash": ctx.interaction is not None, "ack_ms": round(ack * 1000, 1), "result_ms": round(result * 1000, 1)})
+
+command_timings = CommandTimings()
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    command_timings.start(ctx)
+
+@bot.after_invoke
+async def stop_command_timer(ctx):
+    command_timings.finish(ctx)
+
+# Acknowledge a slow command right away, slash commands show "thinking" and prefix commands a typing indicator
+async def acknowledge(ctx):
+    if ctx.interaction is not None:
+        await ctx.defer()
+    else:
+        await ctx.typing()
+    command_timings.acknowledge(ctx)
+
+# Slash commands have to be answered, prefix commands keep failing quietly
+@bot.event
+async def on_command_error(ctx, error):
+    if isinstance(error, commands.CommandNotFound):
+        return
+    
+    if not isinstance(error, (commands.CheckFailure, commands.UserInputError)):
+        log.error("Command failed", exc_info=error, extra={"command": ctx.command.qualified_name if ctx.command else None})
+    
+    if ctx.interaction is not None:
+        if isinstance(error, commands.NoPrivateMessage):
+            message = "This command can only be used in a server."
+        elif isinstance(error, commands.CheckFailure):
+            message = "You don't have permission to use this command."
+        elif isinstance(error, commands.UserInputError):
+            message = str(error)
+        else:
+            message = "An error occurred while running this command."
+        await ctx.send(message, ephemeral=True)
+
+# Register the slash commands with Discord, only when they changed since the last sync
+async def sync_command_tree():
+    payload = sorted((command.to_dict(bot.tree) for command in bot.tree.get_commands()), key=lambda command: command["name"])
+    digest = hashlib.sha256(json.dumps([bot.application_id, payload], sort_keys=True).encode("utf-8")).hexdigest()
+    
+    try:
+        with open(COMMAND_TREE_HASH_FILE) as f:
+            if f.read().strip() == digest:
+                log.info("Command tree unchanged, skipping sync")
+                return False
+    except OSError:
+        pass
+    
+    try:
+        synced = await bot.tree.sync()
+    except discord.HTTPException:
+        log.exception("Error syncing the command tree")
+        return False
+    
+    with open(COMMAND_TREE_HASH_FILE, "w") as f:
+        f.write(digest)
+    log.info("Command tree synced", extra={"commands": len(synced)})
+    return True
+
 # Bot event: Member Join
 @bot.event
 async def on_member_join(member):
-    welcome_channel = bot.get_channel(WELCOME_CHANNEL_ID)
-    if welcome_channel:
+    # Leaving and rejoining must not escape a timeout or mute
+    await punishment_scheduler.reapply(member)
+    await raid_guard.handle_join(member)
+    
+    # Welcome messages are paused while a raid is in progress
+    if raid_guard.is_active(member.guild.id):
+        return
+    
+    welcome_channel = bot.get_channel(guild_settings(member.guild)["welcome_channel_id"] or 0)
+    if welcome_channel and welcome_channel.guild.id == member.guild.id:
         embed = create_welcome_embed(member)
         await welcome_channel.send(embed=embed)
 
+# A timeout removed in the Discord client instead of with $untimeout must not be renewed or reapplied on rejoin
+@bot.event
+async def on_member_update(before, after):
+    if before.is_timed_out() and after.timed_out_until is None:
+        punishment_scheduler.cancel(after.guild.id, after.id, "timeout")
+
+# Same for a tempban lifted early, the entry would otherwise unban a later permanent ban
+@bot.event
+async def on_member_unban(guild, user):
+    punishment_scheduler.cancel(guild.id, user.id, "ban")
+
 # Function to create welcome embed
 def create_welcome_embed(member):
+    settings = guild_settings(member.guild)
+    
     embed = Embed(
         title=f"Welcome to the Server, {member.name}!",
         description=f"Thank you for joining our community, {member.mention}. We're glad to have you here!",
@@ -46,10 +582,10 @@ def create_welcome_embed(member):
     )
     
     embed.set_thumbnail(url=member.avatar.url if member.avatar else member.default_avatar.url)
-    embed.set_author(name="GDPM Server Management", icon_url=bot.user.avatar.url if bot.user.avatar else None)
+    embed.set_author(name=settings["author_name"], icon_url=bot.user.avatar.url if bot.user.avatar else None)
     
     embed.add_field(name="Getting Started", value="Please check the server rules and information channels to get familiar with our community.", inline=False)
-    embed.add_field(name="Need Help?", value="Use `$memberhelp` to see available commands or reach out to our staff team.", inline=False)
+    embed.add_field(name="Need Help?", value=f"Use `{settings['prefix']}memberhelp` to see available commands or reach out to our staff team.", inline=False)
     
     embed.set_footer(text=f"Member #{len(member.guild.members)}", icon_url=member.guild.icon.url if member.guild.icon else None)
     
@@ -65,17 +601,22 @@ async def check_github_updates():
     try:
         # Get organization repositories
         org_repos_url = f"{GITHUB_API_URL}/orgs/{GITHUB_ORG}/repos"
-        response = requests.get(org_repos_url, headers=GITHUB_HEADERS)
+        response = await blocking_work.run(requests.get, org_repos_url, headers=GITHUB_HEADERS, timeout=10, _name="github_request")
         
         if response.status_code != 200:
-            print(f"Error fetching repositories: {response.status_code}")
+            log.warning("Error fetching repositories", extra={"status": response.status_code})
             return
         
         repos = response.json()
         
-        # Get updates channel
-        updates_channel = bot.get_channel(GITHUB_UPDATES_CHANNEL_ID)
-        if not updates_channel:
+        # Get the updates channel of every guild that has one configured
+        updates_channels = {}
+        for guild in bot.guilds:
+            channel = bot.get_channel(guild_settings(guild)["github_updates_channel_id"] or 0)
+            if channel and channel.guild.id == guild.id:
+                updates_channels[channel.id] = channel
+        
+        if not updates_channels:
             return
         
         # Check for updates in each repository
@@ -84,10 +625,10 @@ async def check_github_updates():
             
             # Fetch events for the repository
             events_url = f"{GITHUB_API_URL}/repos/{GITHUB_ORG}/{repo_name}/events"
-            events_response = requests.get(events_url, headers=GITHUB_HEADERS)
+            events_response = await blocking_work.run(requests.get, events_url, headers=GITHUB_HEADERS, timeout=10, _name="github_request")
             
             if events_response.status_code != 200:
-                print(f"Error fetching events for {repo_name}: {events_response.status_code}")
+                log.warning("Error fetching events", extra={"repo": repo_name, "status": events_response.status_code})
                 continue
             
             events = events_response.json()
@@ -103,51 +644,81 @@ async def check_github_updates():
                 event_id = event['id']
                 created_at = event.get('created_at', '')
                 if not created_at:
-                    print(f"Error: 'created_at' is missing or invalid for event: {event}")
+                    log.warning("Event is missing 'created_at'", extra={"repo": repo_name, "event_id": event_id})
                     continue
                 
                 # Parse the event timestamp
                 try:
                     timestamp = datetime.strptime(created_at, '%Y-%m-%dT%H:%M:%SZ')
                 except ValueError as ve:
-                    print(f"Error parsing timestamp {created_at}: {ve}")
-                    timestamp = datetime.datetime.utcnow()  # Default to current UTC time in case of an error
+                    log.warning("Error parsing event timestamp", extra={"created_at": created_at, "error": str(ve)})
+                    timestamp = datetime.utcnow()  # Default to current UTC time in case of an error
                 
                 # Check if event is older than 10 minutes or already sent
-                current_time = datetime.datetime.utcnow()
+                current_time = datetime.utcnow()
                 time_difference = current_time - timestamp
                 if event_id in sent_events or time_difference > timedelta(minutes=10):
                     continue
                 
                 # Send the event if it hasn't been sent yet and is recent enough
                 embed = create_github_update_embed(event, repo)
-                await updates_channel.send(embed=embed)
+                for updates_channel in updates_channels.values():
+                    await updates_channel.send(embed=embed)
                 
                 # Add the event to the sent_events dictionary with the current timestamp
                 sent_events[event_id] = current_time
     
-    except Exception as e:
-        print(f"Error checking GitHub updates: {e}")
+    except Exception:
+        log.exception("Error checking GitHub updates")
+
+# Pick up edits to the guild config file without a restart
+@tasks.loop(seconds=30)
+async def reload_guild_config():
+    if guild_config.reload_if_changed():
+        log.info("Guild config reloaded", extra={"version": guild_config.version})
+
+# End raid mode for guilds that have been quiet for long enough
+@tasks.loop(seconds=30)
+async def end_quiet_raids():
+    for guild_id in raid_guard.quiet_guilds(time.monotonic()):
+        guild = bot.get_guild(guild_id)
+        if guild is None:
+            raid_guard.states.pop(guild_id, None)
+            continue
+        
+        await raid_guard.end_raid(guild)
+        
+        log_channel = bot.get_channel(guild_settings(guild)["mod_log_channel_id"] or 0)
+        if log_channel and log_channel.guild.id == guild.id:
+            await log_channel.send("Raid mode ended after a quiet period. Welcome messages resumed and locked channels were reopened.")
+
+# Snapshot every guild's members for $stats
+@tasks.loop(hours=ANALYTICS_INTERVAL_HOURS)
+async def snapshot_member_analytics():
+    for guild in bot.guilds:
+        try:
+            await take_member_snapshot(guild)
+        except Exception:
+            log.exception("Error taking member analytics snapshot", extra={"guild_id": guild.id})
 
 # Function to create GitHub update embed
 def create_github_update_embed(event, repo):
     # Check if 'created_at' is a valid string
     created_at = event.get('created_at', '')
     if not created_at:
-        print(f"Error: 'created_at' is missing or invalid for event: {event}")
+        log.warning("Event is missing 'created_at'", extra={"event_id": event.get('id')})
         return Embed(title="Error", description="Missing 'created_at' for event.")
 
     try:
-        # Print out the created_at to debug
-        print(f"Parsing event timestamp: {created_at}")
+        log.debug("Parsing event timestamp %s", created_at)
         
         # Convert 'created_at' string to a datetime object
         timestamp = datetime.strptime(created_at, '%Y-%m-%dT%H:%M:%SZ')  # Correct use of strptime
 
     except ValueError as ve:
         # Handle parsing errors
-        print(f"Error parsing timestamp {created_at}: {ve}")
-        timestamp = datetime.datetime.utcnow()  # Default to current UTC time in case of an error
+        log.warning("Error parsing event timestamp", extra={"created_at": created_at, "error": str(ve)})
+        timestamp = datetime.utcnow()  # Default to current UTC time in case of an error
     
     embed = Embed(
         title=f"GitHub Update: {repo['name']}",
@@ -192,17 +763,843 @@ def create_github_update_embed(event, repo):
     
     return embed
 
+# Outcome of a lockdown or unlock run
+class LockdownResult:
+    def __init__(self):
+        self.changed = []
+        self.skipped = []
+        self.failed = []  # (channel, error)
+        self.elapsed = 0.0
+
+# Locks channels for @everyone and remembers their previous overwrite on disk, so unlocking restores it exactly
+class LockdownManager:
+    def __init__(self, path):
+        self.path = path
+        self.snapshots = {}  # {guild_id: {channel_id: [allow, deny] or None}}
+        self.load()
+    
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.error("Error loading lockdown state", extra={"path": self.path, "error": str(e)})
+            return
+        
+        self.snapshots = {
+            int(guild_id): {int(channel_id): pair for channel_id, pair in channels.items()}
+            for guild_id, channels in raw.items()
+        }
+    
+    def save(self):
+        raw = {
+            str(guild_id): {str(channel_id): pair for channel_id, pair in channels.items()}
+            for guild_id, channels in self.snapshots.items() if channels
+        }
+        
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(raw, f)
+        os.replace(tmp_path, self.path)
+    
+    def locked_channel_ids(self, guild_id):
+        return list(self.snapshots.get(guild_id, {}))
+    
+    # Run one permission update per channel, at most LOCKDOWN_CONCURRENCY at a time
+    async def apply(self, channels, update, result):
+        semaphore = asyncio.Semaphore(LOCKDOWN_CONCURRENCY)
+        
+        async def run(channel):
+            async with semaphore:
+                try:
+                    await update(channel)
+                    result.changed.append(channel)
+                except discord.HTTPException as e:
+                    result.failed.append((channel, e))
+        
+        await asyncio.gather(*(run(channel) for channel in channels))
+    
+    async def lock(self, guild, channels):
+        result = LockdownResult()
+        start = time.perf_counter()
+        role = guild.default_role
+        guild_snapshots = self.snapshots.setdefault(guild.id, {})
+        
+        to_lock = []
+        for channel in channels:
+            # Already locked, keep the snapshot of the state from before the first lock
+            if channel.id in guild_snapshots:
+                result.skipped.append(channel)
+                continue
+            
+            if role in channel.overwrites:
+                allow, deny = channel.overwrites_for(role).pair()
+                guild_snapshots[channel.id] = [allow.value, deny.value]
+            else:
+                guild_snapshots[channel.id] = None
+            to_lock.append(channel)
+        
+        # Write the snapshot before touching any channel, so a crash midway can still be undone
+        self.save()
+        
+        async def update(channel):
+            overwrite = channel.overwrites_for(role)
+            overwrite.send_messages = False
+            await channel.set_permissions(role, overwrite=overwrite)
+        
+        await self.apply(to_lock, update, result)
+        
+        # Channels that could not be locked have nothing to restore
+        for channel, _ in result.failed:
+            guild_snapshots.pop(channel.id, None)
+        self.save()
+        
+        result.elapsed = time.perf_counter() - start
+        log.info("Lockdown applied", extra={"guild_id": guild.id, "changed": len(result.changed), "failed": len(result.failed), "elapsed": result.elapsed})
+        return result
+    
+    # Restore the given channels (every locked channel if None) to their state before the lockdown
+    async def unlock(self, guild, channels=None):
+        result = LockdownResult()
+        start = time.perf_counter()
+        role = guild.default_role
+        guild_snapshots = self.snapshots.get(guild.id, {})
+        
+        if channels is None:
+            # Forget snapshots of channels that were deleted in the meantime
+            for channel_id in [channel_id for channel_id in guild_snapshots if not guild.get_channel(channel_id)]:
+                del guild_snapshots[channel_id]
+            channels = [guild.get_channel(channel_id) for channel_id in guild_snapshots]
+        
+        to_unlock = []
+        for channel in channels:
+            if channel.id in guild_snapshots:
+                to_unlock.append(channel)
+            else:
+                result.skipped.append(channel)
+        
+        async def update(channel):
+            pair = guild_snapshots[channel.id]
+            if pair is None:
+                await channel.set_permissions(role, overwrite=None)
+            else:
+                allow, deny = pair
+                overwrite = discord.PermissionOverwrite.from_pair(discord.Permissions(allow), discord.Permissions(deny))
+                await channel.set_permissions(role, overwrite=overwrite)
+        
+        await self.apply(to_unlock, update, result)
+        
+        for channel in result.changed:
+            guild_snapshots.pop(channel.id, None)
+        self.save()
+        
+        result.elapsed = time.perf_counter() - start
+        log.info("Lockdown lifted", extra={"guild_id": guild.id, "changed": len(result.changed), "failed": len(result.failed), "elapsed": result.elapsed})
+        return result
+
+lockdown_manager = LockdownManager(LOCKDOWN_STATE_FILE)
+
+# Discord refuses native timeouts longer than 28 days (in seconds)
+MAX_NATIVE_TIMEOUT = 28 * 86400
+# How long to wait before retrying an expiry that failed for a temporary reason
+PUNISHMENT_RETRY_DELAY = 60
+# Long timeouts are renewed this many seconds before Discord lifts the current chunk
+TIMEOUT_RENEW_MARGIN = 60
+
+# Split a timeout into the part Discord can apply now and when the scheduler has to renew it (None if never)
+def split_timeout(duration):
+    native_duration = min(duration, MAX_NATIVE_TIMEOUT)
+    if duration > native_duration:
+        return native_duration, native_duration - TIMEOUT_RENEW_MARGIN
+    return native_duration, None
+
+# Timed punishments (timeouts, tempbans, mutes) stored in SQLite, with their next due time kept in a min-heap.
+# A single task sleeps until the earliest entry is due, so pending punishments cost nothing while waiting.
+class PunishmentScheduler:
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        # WAL with normal sync keeps each write from waiting on a full fsync while the event loop is blocked
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS punishments ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, guild_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+            "kind TEXT NOT NULL, role_id INTEGER, reason TEXT, expires_at REAL NOT NULL, next_run REAL NOT NULL)"
+        )
+        self.db.commit()
+        
+        self.pending = {}  # {punishment_id: punishment}
+        self.by_target = {}  # {(guild_id, user_id, kind): punishment_id}
+        self.heap = []  # (next_run, punishment_id), entries that no longer match `pending` are skipped
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.load()
+    
+    # Rebuild the heap from the database after a restart
+    def load(self):
+        rows = self.db.execute(
+            "SELECT id, guild_id, user_id, kind, role_id, reason, expires_at, next_run FROM punishments"
+        ).fetchall()
+        
+        for row in rows:
+            punishment = dict(zip(("id", "guild_id", "user_id", "kind", "role_id", "reason", "expires_at", "next_run"), row))
+            self.pending[punishment["id"]] = punishment
+            self.by_target[(punishment["guild_id"], punishment["user_id"], punishment["kind"])] = punishment["id"]
+            self.heap.append((punishment["next_run"], punishment["id"]))
+        
+        heapq.heapify(self.heap)
+        log.info("Punishment scheduler loaded", extra={"pending": len(self.pending)})
+    
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+    
+    def push(self, punishment_id, next_run):
+        heapq.heappush(self.heap, (next_run, punishment_id))
+        # Only an entry that became the earliest changes how long the task has to sleep
+        if self.heap[0][1] == punishment_id:
+            self.wakeup.set()
+    
+    # Schedule a punishment to end `duration` seconds from now, replacing any earlier one of the same kind.
+    # `run_in` makes the scheduler look at it sooner, e.g. to renew a timeout before Discord lifts it.
+    def schedule(self, guild_id, user_id, kind, duration, run_in=None, role_id=None, reason=None):
+        self.cancel(guild_id, user_id, kind)
+        
+        now = time.time()
+        expires_at = now + duration
+        next_run = now + min(run_in, duration) if run_in is not None else expires_at
+        
+        cursor = self.db.execute(
+            "INSERT INTO punishments (guild_id, user_id, kind, role_id, reason, expires_at, next_run) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (guild_id, user_id, kind, role_id, reason, expires_at, next_run)
+        )
+        self.db.commit()
+        
+        punishment = {
+            "id": cursor.lastrowid,
+            "guild_id": guild_id,
+            "user_id": user_id,
+            "kind": kind,
+            "role_id": role_id,
+            "reason": reason,
+            "expires_at": expires_at,
+            "next_run": next_run,
+        }
+        self.pending[punishment["id"]] = punishment
+        self.by_target[(guild_id, user_id, kind)] = punishment["id"]
+        self.push(punishment["id"], next_run)
+        
+        return punishment
+    
+    def cancel(self, guild_id, user_id, kind):
+        punishment_id = self.by_target.get((guild_id, user_id, kind))
+        if punishment_id is None:
+            return None
+        return self.remove(punishment_id)
+    
+    def remove(self, punishment_id):
+        punishment = self.pending.pop(punishment_id, None)
+        if punishment is None:
+            return None
+        
+        self.by_target.pop((punishment["guild_id"], punishment["user_id"], punishment["kind"]), None)
+        self.db.execute("DELETE FROM punishments WHERE id = ?", (punishment_id,))
+        self.db.commit()
+        return punishment
+    
+    def reschedule(self, punishment, next_run):
+        punishment["next_run"] = next_run
+        self.db.execute("UPDATE punishments SET next_run = ? WHERE id = ?", (next_run, punishment["id"]))
+        self.db.commit()
+        self.push(punishment["id"], next_run)
+    
+    def for_guild(self, guild_id):
+        return sorted((p for p in self.pending.values() if p["guild_id"] == guild_id), key=lambda p: p["expires_at"])
+    
+    async def run(self):
+        while True:
+            self.wakeup.clear()
+            
+            # Drop heap entries for punishments that were cancelled or moved
+            while self.heap:
+                next_run, punishment_id = self.heap[0]
+                punishment = self.pending.get(punishment_id)
+                if punishment and punishment["next_run"] == next_run:
+                    break
+                heapq.heappop(self.heap)
+            
+            if not self.heap:
+                await self.wakeup.wait()
+                continue
+            
+            delay = self.heap[0][0] - time.time()
+            if delay > 0:
+                # Sleep until the earliest entry is due, or until an earlier one is scheduled
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            _, punishment_id = heapq.heappop(self.heap)
+            try:
+                await self.fire(self.pending[punishment_id])
+            except Exception:
+                log.exception("Error running punishment expiry", extra={"punishment_id": punishment_id})
+                self.remove(punishment_id)
+    
+    async def fire(self, punishment):
+        guild = bot.get_guild(punishment["guild_id"])
+        if guild is None:
+            self.remove(punishment["id"])
+            return
+        
+        now = time.time()
+        kind = punishment["kind"]
+        
+        try:
+            if kind == "ban":
+                await guild.unban(discord.Object(id=punishment["user_id"]), reason="Temporary ban expired")
+            else:
+                member = guild.get_member(punishment["user_id"])
+                if member is None:
+                    try:
+                        member = await guild.fetch_member(punishment["user_id"])
+                    except discord.NotFound:
+                        member = None
+                
+                if member is None:
+                    # The user left, keep the punishment until it expires so it is applied again if they rejoin
+                    if punishment["expires_at"] > now:
+                        self.reschedule(punishment, punishment["expires_at"])
+                        return
+                elif kind == "timeout":
+                    if await self.apply_timeout(member, punishment, now):
+                        return
+                elif kind == "mute":
+                    role = guild.get_role(punishment["role_id"])
+                    if role:
+                        await member.remove_roles(role, reason="Temporary mute expired")
+        except discord.NotFound:
+            # The user was already unbanned or the role is gone, nothing left to undo
+            pass
+        except discord.Forbidden:
+            log.warning("Missing permissions to end punishment", extra={"guild_id": guild.id, "user_id": punishment["user_id"], "kind": kind})
+        except discord.HTTPException as e:
+            log.warning("Error ending punishment, retrying", extra={"guild_id": guild.id, "user_id": punishment["user_id"], "kind": kind, "error": str(e)})
+            self.reschedule(punishment, now + PUNISHMENT_RETRY_DELAY)
+            return
+        
+        log.info("Punishment expired", extra={"guild_id": guild.id, "user_id": punishment["user_id"], "kind": kind})
+        self.remove(punishment["id"])
+    
+    # Apply the next chunk of a timeout, returns False once there is nothing left to apply
+    async def apply_timeout(self, member, punishment, now):
+        remaining = punishment["expires_at"] - now
+        if remaining <= 1:
+            return False
+        
+        chunk = min(remaining, MAX_NATIVE_TIMEOUT)
+        await member.timeout(timedelta(seconds=chunk), reason=punishment["reason"])
+        
+        # Renew a little before Discord lifts this chunk so there is no gap, the last chunk only needs cleaning up
+        if remaining > chunk:
+            self.reschedule(punishment, now + chunk - TIMEOUT_RENEW_MARGIN)
+        else:
+            self.reschedule(punishment, punishment["expires_at"])
+        return True
+    
+    # Put active timeouts and mutes back on a member who left and rejoined
+    async def reapply(self, member):
+        now = time.time()
+        
+        for kind in ("timeout", "mute"):
+            punishment_id = self.by_target.get((member.guild.id, member.id, kind))
+            if punishment_id is None:
+                continue
+            
+            punishment = self.pending[punishment_id]
+            try:
+                if kind == "timeout":
+                    await self.apply_timeout(member, punishment, now)
+                elif punishment["expires_at"] > now:
+                    role = member.guild.get_role(punishment["role_id"])
+                    if role:
+                        await member.add_roles(role, reason="Mute still active")
+            except discord.HTTPException as e:
+                log.warning("Could not reapply punishment", extra={"guild_id": member.guild.id, "user_id": member.id, "kind": kind, "error": str(e)})
+
+punishment_scheduler = PunishmentScheduler(PUNISHMENTS_DB)
+
+# Block header in a segment file: magic, compressed length, record count, first and last record time
+ARCHIVE_BLOCK_HEADER = struct.Struct("<4sIIdd")
+ARCHIVE_BLOCK_MAGIC = b"SBA1"
+# Index entry, one per block: first and last record time, block offset and total block length
+ARCHIVE_INDEX_ENTRY = struct.Struct("<ddQI")
+
+# Append-only archive of message records. Records are batched by a background thread into zlib-compressed
+# blocks, and every block gets an entry in a small index file next to its segment, so a time range
+# can be read back by decompressing only the blocks that overlap it.
+class MessageArchive:
+    def __init__(self, directory, segment_bytes=ARCHIVE_SEGMENT_BYTES, batch_records=ARCHIVE_BATCH_RECORDS, flush_seconds=ARCHIVE_FLUSH_SECONDS):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.batch_records = batch_records
+        self.flush_seconds = flush_seconds
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.segment = None
+        self.index = None
+        self.segment_number = 0
+        # Counters for write amplification: bytes handed in vs bytes that reached the disk
+        self.stats = {"records": 0, "blocks": 0, "raw_bytes": 0, "written_bytes": 0}
+    
+    def start(self):
+        if self.thread is not None:
+            return
+        
+        os.makedirs(self.directory, exist_ok=True)
+        existing = self.segment_paths()
+        self.segment_number = int(os.path.basename(existing[-1])[8:16]) if existing else 0
+        self.open_segment()
+        
+        self.thread = threading.Thread(target=self.run, name="message-archive", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+    
+    def stop(self):
+        if self.thread is None:
+            return
+        
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.segment.close()
+        self.index.close()
+    
+    # Called from the event loop, only costs an enqueue
+    def append(self, record):
+        self.queue.put(record)
+    
+    def segment_paths(self):
+        return sorted(glob.glob(os.path.join(self.directory, "segment-*.seg")))
+    
+    def open_segment(self):
+        path = os.path.join(self.directory, f"segment-{self.segment_number:08d}")
+        self.segment = open(f"{path}.seg", "ab")
+        self.index = open(f"{path}.idx", "ab")
+    
+    def run(self):
+        batch = []
+        deadline = None
+        
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                record = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                record = False
+            
+            if record:
+                batch.append(record)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_seconds
+            
+            if batch and (record is None or record is False or len(batch) >= self.batch_records):
+                try:
+                    self.write_block(batch)
+                except OSError:
+                    log.exception("Error writing message archive block")
+                batch = []
+                deadline = None
+            
+            if record is None:
+                return
+    
+    def write_block(self, batch):
+        payload = "\n".join(json.dumps(record, default=str) for record in batch).encode("utf-8")
+        compressed = zlib.compress(payload, 6)
+        first_ts = min(record["ts"] for record in batch)
+        last_ts = max(record["ts"] for record in batch)
+        
+        if self.segment.tell() >= self.segment_bytes:
+            self.segment.close()
+            self.index.close()
+            self.segment_number += 1
+            self.open_segment()
+        
+        offset = self.segment.tell()
+        header = ARCHIVE_BLOCK_HEADER.pack(ARCHIVE_BLOCK_MAGIC, len(compressed), len(batch), first_ts, last_ts)
+        self.segment.write(header + compressed)
+        self.segment.flush()
+        
+        # The index entry only goes out once its block is on disk, so readers never see a dangling entry
+        self.index.write(ARCHIVE_INDEX_ENTRY.pack(first_ts, last_ts, offset, len(header) + len(compressed)))
+        self.index.flush()
+        
+        self.stats["records"] += len(batch)
+        self.stats["blocks"] += 1
+        self.stats["raw_bytes"] += len(payload)
+        self.stats["written_bytes"] += len(header) + len(compressed) + ARCHIVE_INDEX_ENTRY.size
+    
+    # Records between two UNIX timestamps, optionally limited to one channel. Safe to call from any thread.
+    def read_range(self, start_ts, end_ts, channel_id=None):
+        records = []
+        
+        for segment_path in self.segment_paths():
+            index_path = segment_path[:-4] + ".idx"
+            try:
+                with open(index_path, "rb") as f:
+                    index_data = f.read()
+            except FileNotFoundError:
+                continue
+            
+            blocks = [
+                entry for entry in ARCHIVE_INDEX_ENTRY.iter_unpack(index_data[:len(index_data) - len(index_data) % ARCHIVE_INDEX_ENTRY.size])
+                if entry[1] >= start_ts and entry[0] <= end_ts
+            ]
+            if not blocks:
+                continue
+            
+            with open(segment_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for _, _, offset, length in blocks:
+                    magic, compressed_length, _, _, _ = ARCHIVE_BLOCK_HEADER.unpack_from(mapped, offset)
+                    if magic != ARCHIVE_BLOCK_MAGIC:
+                        log.warning("Corrupt message archive block", extra={"path": segment_path, "offset": offset})
+                        continue
+                    
+                    start = offset + ARCHIVE_BLOCK_HEADER.size
+                    payload = zlib.decompress(mapped[start:start + compressed_length])
+                    for line in payload.split(b"\n"):
+                        record = json.loads(line)
+                        if start_ts <= record["ts"] <= end_ts and (channel_id is None or record.get("channel_id") == channel_id):
+                            records.append(record)
+        
+        records.sort(key=lambda record: record["ts"])
+        return records
+
+message_archive = MessageArchive(ARCHIVE_DIR)
+
+# Turn a message into an archive record
+def archive_record(kind, message, **extra):
+    record = {
+        "ts": time.time(),
+        "type": kind,
+        "guild_id": message.guild.id if message.guild else None,
+        "channel_id": message.channel.id,
+        "message_id": message.id,
+        "author_id": message.author.id,
+        "author_name": message.author.name,
+        "content": message.content,
+        "attachments": [a.url for a in message.attachments],
+    }
+    record.update(extra)
+    return record
+
+# Words of at least two characters are indexed
+_SEARCH_TOKEN = re.compile(r"\w{2,}")
+
+# Inverted index over sniped messages and moderation logs. Entries are added and removed together with
+# the buffers that hold them, so the index never outgrows what the bot still remembers.
+class SearchIndex:
+    def __init__(self):
+        self.documents = {}  # {doc_id: document}
+        self.by_token = {}   # {token: set of doc_ids}
+        self.by_user = {}    # {user_id: set of doc_ids}
+        self.by_guild = {}   # {guild_id: set of doc_ids}
+        self.ids = itertools.count(1)
+    
+    @staticmethod
+    def tokenize(text):
+        return set(_SEARCH_TOKEN.findall(text.lower()))
+    
+    # Index an entry, `user_ids` are everyone it can be found by (author, banned user, moderator...)
+    def add(self, kind, guild_id, channel_id, user_ids, text, summary):
+        doc_id = next(self.ids)
+        document = {
+            "id": doc_id,
+            "kind": kind,
+            "guild_id": guild_id,
+            "channel_id": channel_id,
+            "user_ids": set(user_ids),
+            "tokens": self.tokenize(text),
+            "summary": summary,
+            "timestamp": time.time(),
+        }
+        self.documents[doc_id] = document
+        
+        for token in document["tokens"]:
+            self.by_token.setdefault(token, set()).add(doc_id)
+        for user_id in document["user_ids"]:
+            self.by_user.setdefault(user_id, set()).add(doc_id)
+        self.by_guild.setdefault(guild_id, set()).add(doc_id)
+        
+        return doc_id
+    
+    def remove(self, doc_id):
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return
+        
+        for postings, keys in ((self.by_token, document["tokens"]), (self.by_user, document["user_ids"]), (self.by_guild, (document["guild_id"],))):
+            for key in keys:
+                doc_ids = postings.get(key)
+                if doc_ids is None:
+                    continue
+                doc_ids.discard(doc_id)
+                # Drop empty posting lists so evicted words don't pile up
+                if not doc_ids:
+                    del postings[key]
+    
+    # Entries of a guild matching every term (and the user, if given), newest first
+    def search(self, guild_id, user_id=None, text="", kind=None, limit=10):
+        postings = [self.by_guild.get(guild_id, set())]
+        if user_id is not None:
+            postings.append(self.by_user.get(user_id, set()))
+        for token in self.tokenize(text):
+            postings.append(self.by_token.get(token, set()))
+        
+        # Walk the shortest posting list and check the others, so cost follows the rarest term
+        postings.sort(key=len)
+        matches = [
+            self.documents[doc_id] for doc_id in postings[0]
+            if all(doc_id in other for other in postings[1:])
+        ]
+        if kind is not None:
+            matches = [document for document in matches if document["kind"] == kind]
+        
+        matches.sort(key=lambda document: document["timestamp"], reverse=True)
+        return matches[:limit], len(matches)
+
+search_index = SearchIndex()
+
+# One point-in-time copy of a guild's members, stored column by column so aggregations are array operations.
+# Times are unix seconds (NaN when Discord didn't send a join time), role ids are in CSR form:
+# the roles of member i are role_ids[role_offsets[i]:role_offsets[i + 1]].
+class MemberSnapshot:
+    COLUMNS = ("ids", "joined_at", "created_at", "bots", "role_offsets", "role_ids")
+    
+    def __init__(self, guild_id, taken_at, ids, joined_at, created_at, bots, role_offsets, role_ids):
+        self.guild_id = guild_id
+        self.taken_at = taken_at
+        self.ids = ids
+        self.joined_at = joined_at
+        self.created_at = created_at
+        self.bots = bots
+        self.role_offsets = role_offsets
+        self.role_ids = role_ids
+    
+    @property
+    def size(self):
+        return self.ids.size
+    
+    # Blocking for large guilds, call it through blocking_work with a copy of guild.members
+    @classmethod
+    def from_members(cls, guild_id, members, taken_at):
+        count = len(members)
+        ids = np.fromiter((member.id for member in members), dtype=np.uint64, count=count)
+        joined_at = np.fromiter((member.joined_at.timestamp() if member.joined_at else np.nan for member in members), dtype=np.float64, count=count)
+        created_at = np.fromiter((member.created_at.timestamp() for member in members), dtype=np.float64, count=count)
+        bots = np.fromiter((member.bot for member in members), dtype=bool, count=count)
+        
+        # member._roles is the raw id array, member.roles would look up and sort Role objects for every member
+        role_offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.fromiter((len(member._roles) for member in members), dtype=np.int64, count=count), out=role_offsets[1:])
+        role_ids = np.fromiter(itertools.chain.from_iterable(member._roles for member in members), dtype=np.uint64, count=int(role_offsets[-1]))
+        
+        return cls(guild_id, taken_at, ids, joined_at, created_at, bots, role_offsets, role_ids)
+    
+    def save(self, path):
+        np.savez_compressed(path, taken_at=np.float64(self.taken_at), **{column: getattr(self, column) for column in self.COLUMNS})
+    
+    @classmethod
+    def load(cls, guild_id, path, columns=COLUMNS):
+        with np.load(path) as data:
+            arrays = {column: data[column] if column in columns else None for column in cls.COLUMNS}
+            return cls(guild_id, float(data["taken_at"]), **arrays)
+    
+    # {role_id: member count} for the `limit` most common roles
+    def role_histogram(self, limit=10):
+        role_ids, counts = np.unique(self.role_ids, return_counts=True)
+        top = np.argsort(counts, kind="stable")[::-1][:limit]
+        return dict(zip(role_ids[top].tolist(), counts[top].tolist()))
+    
+    # Member count per ACCOUNT_AGE_BUCKETS bucket, the same buckets raid detection uses
+    def account_age_histogram(self):
+        ages = (self.taken_at - self.created_at) / 86400
+        buckets = np.searchsorted(ACCOUNT_AGE_BUCKETS, ages, side="right")
+        return np.bincount(buckets, minlength=len(ACCOUNT_AGE_BUCKETS) + 1).tolist()
+
+# Members that joined and left between two snapshots
+def member_churn(previous_ids, current_ids):
+    joined = np.setdiff1d(current_ids, previous_ids, assume_unique=True).size
+    left = np.setdiff1d(previous_ids, current_ids, assume_unique=True).size
+    return joined, left
+
+# Of the members in `first`, grouped by how many `period` seconds before it they joined, how many are still in `latest`.
+# Returns two arrays indexed by cohort (0 is the newest): cohort sizes and members retained.
+def cohort_retention(first, latest, period=7 * 86400, cohorts=8):
+    cohort = (first.taken_at - first.joined_at) // period
+    known = np.isfinite(cohort) & (cohort >= 0) & (cohort < cohorts)
+    cohort = cohort[known].astype(np.int64)
+    retained = np.isin(first.ids[known], latest.ids, assume_unique=True)
+    sizes = np.bincount(cohort, minlength=cohorts)
+    kept = np.bincount(cohort, weights=retained, minlength=cohorts).astype(np.int64)
+    return sizes, kept
+
+# Snapshot files per guild, written by the snapshot_member_analytics loop
+class MemberAnalytics:
+    def __init__(self, directory, max_snapshots=ANALYTICS_MAX_SNAPSHOTS):
+        self.directory = directory
+        self.max_snapshots = max_snapshots
+    
+    def guild_directory(self, guild_id):
+        return os.path.join(self.directory, str(guild_id))
+    
+    # Snapshot files of a guild, oldest first, named after the time they were taken
+    def snapshot_paths(self, guild_id):
+        paths = glob.glob(os.path.join(self.guild_directory(guild_id), "*.npz"))
+        return sorted(paths, key=lambda path: int(os.path.basename(path)[:-4]))
+    
+    def record(self, snapshot):
+        os.makedirs(self.guild_directory(snapshot.guild_id), exist_ok=True)
+        snapshot.save(os.path.join(self.guild_directory(snapshot.guild_id), f"{int(snapshot.taken_at)}.npz"))
+        
+        paths = self.snapshot_paths(snapshot.guild_id)
+        for path in paths[:max(len(paths) - self.max_snapshots, 0)]:
+            os.remove(path)
+    
+    # Everything $stats shows for the snapshots of the last `days` days. CPU bound and picklable,
+    # so it goes to blocking_work's process pool when one is configured.
+    def report(self, guild_id, days, now):
+        start = time.perf_counter()
+        paths = [path for path in self.snapshot_paths(guild_id) if int(os.path.basename(path)[:-4]) >= now - days * 86400]
+        if not paths:
+            return None
+        
+        first = MemberSnapshot.load(guild_id, paths[0])
+        latest = MemberSnapshot.load(guild_id, paths[-1]) if len(paths) > 1 else first
+        
+        # Only the ids of the snapshots in between are needed, and only two are held at a time
+        joined = left = 0
+        previous_ids = first.ids
+        for path in paths[1:]:
+            current_ids = latest.ids if path == paths[-1] else MemberSnapshot.load(guild_id, path, columns=("ids",)).ids
+            pair_joined, pair_left = member_churn(previous_ids, current_ids)
+            joined += pair_joined
+            left += pair_left
+            previous_ids = current_ids
+        
+        sizes, kept = cohort_retention(first, latest)
+        bots = int(np.count_nonzero(latest.bots))
+        
+        return {
+            "snapshots": len(paths),
+            "since": first.taken_at,
+            "taken_at": latest.taken_at,
+            "members": latest.size,
+            "bots": bots,
+            "humans": latest.size - bots,
+            "growth": latest.size - first.size,
+            "joined": joined,
+            "left": left,
+            "retention": list(zip(sizes.tolist(), kept.tolist())),
+            "roles": latest.role_histogram(),
+            "account_ages": latest.account_age_histogram(),
+            "seconds": time.perf_counter() - start,
+        }
+
+member_analytics = MemberAnalytics(ANALYTICS_DIR)
+
+# Copy the member list on the loop, build and write the arrays on a worker thread
+async def take_member_snapshot(guild):
+    members = list(guild.members)
+    snapshot = await blocking_work.run(MemberSnapshot.from_members, guild.id, members, time.time(), _timeout=300, _name="analytics_snapshot")
+    await blocking_work.run(member_analytics.record, snapshot, _name="analytics_save")
+    return snapshot
+
+# Gather the system details shown by $sys --b, blocking, call it through blocking_work
+def collect_system_info():
+    info = {}
+    
+    info["system"] = (
+        f"OS: {platform.system()} {platform.release()}\n"
+        f"Version: {platform.version()}\n"
+        f"Architecture: {platform.machine()}\n"
+        f"Processor: {platform.processor()}"
+    )
+    
+    info["python"] = (
+        f"Version: {platform.python_version()}\n"
+        f"Implementation: {platform.python_implementation()}\n"
+        f"Compiler: {platform.python_compiler()}\n"
+        f"Build: {' '.join(platform.python_build())}"
+    )
+    
+    # Memory usage
+    process = psutil.Process(os.getpid())
+    memory_usage = process.memory_info().rss / 1024 / 1024  # Convert to MB
+    virtual_memory = psutil.virtual_memory()
+    
+    info["resources"] = (
+        f"Memory: {memory_usage:.2f} MB\n"
+        f"CPU Usage: {psutil.cpu_percent()}%\n"
+        f"Available Memory: {virtual_memory.available / 1024 / 1024:.2f} MB / {virtual_memory.total / 1024 / 1024:.2f} MB\n"
+        f"Disk Usage: {psutil.disk_usage('/').percent}%"
+    )
+    
+    # Network information
+    info["network"] = None
+    if hasattr(psutil, 'net_if_addrs'):
+        network_text = ""
+        for interface, addresses in psutil.net_if_addrs().items():
+            for address in addresses:
+                if address.family == psutil.AF_LINK:
+                    network_text += f"Interface: {interface}, MAC: {address.address}\n"
+                elif address.family == 2:  # IPv4
+                    network_text += f"Interface: {interface}, IPv4: {address.address}\n"
+        info["network"] = network_text
+    
+    info["process_started"] = process.create_time()
+    
+    return info
+
+# Count bots and online humans in one pass, runs on a worker thread for large guilds
+def count_members(members):
+    bot_count = 0
+    online_members = 0
+    for member in members:
+        if member.bot:
+            bot_count += 1
+        elif member.status != discord.Status.offline:
+            online_members += 1
+    return bot_count, online_members
+
+# Ban log entries kept in memory, $banlogshow lists them all and an embed holds at most 25 fields
+BAN_LOG_LIMIT = 25
+
 # Staff Commands
 class StaffCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.ban_logs = []
+        # Newest BAN_LOG_LIMIT bans, with the search index entry of each one (None outside a guild)
+        self.ban_logs = deque(maxlen=BAN_LOG_LIMIT)
+        self.ban_doc_ids = deque(maxlen=BAN_LOG_LIMIT)
+        
+        # Hide the slash versions from members without administrator permissions, and from DMs
+        for command in self.get_commands():
+            command.app_command.default_permissions = discord.Permissions(administrator=True)
+            command.app_command.guild_only = True
     
     async def cog_check(self, ctx):
         # Check if user has administrator permissions
         return ctx.author.guild_permissions.administrator
     
-    @commands.command(name="staffhelp")
+    @commands.hybrid_command(name="staffhelp", description="Show the staff commands")
     async def staff_help(self, ctx):
         # Check if command was used in a server (not DM)
         if not ctx.guild:
@@ -212,6 +1609,8 @@ class StaffCommands(commands.Cog):
         if not ctx.author.guild_permissions.administrator:
             return await ctx.send("You don't have permission to use this command.")
         
+        prefix = guild_settings(ctx.guild)["prefix"]
+        
         embed = Embed(
             title="Staff Commands",
             description="Here are the commands available to staff members:",
@@ -219,23 +1618,36 @@ class StaffCommands(commands.Cog):
             timestamp=datetime.utcnow()
         )
         
-        embed.set_author(name="GDPM Server Management", icon_url=bot.user.avatar.url if bot.user.avatar else None)
+        embed.set_author(name=guild_settings(ctx.guild)["author_name"], icon_url=bot.user.avatar.url if bot.user.avatar else None)
         
-        embed.add_field(name="`$ban <user> <reason>`", value="Ban a user from the server", inline=False)
-        embed.add_field(name="`$logban <numbanback> <toJson/toDict> <extra note>`", value="Log a ban entry", inline=False)
-        embed.add_field(name="`$banlogshow`", value="Display the ban logs", inline=False)
-        embed.add_field(name="`$lockchannel <option> <channelID>`", value="Lock a channel", inline=False)
-        embed.add_field(name="`$timeout <user> <time> <toJson/toDict> <reason>`", value="Timeout a user", inline=False)
-        embed.add_field(name="`$sys --b`", value="Display detailed system information", inline=False)
+        embed.add_field(name=f"`{prefix}ban <user> <reason>`", value="Ban a user from the server", inline=False)
+        embed.add_field(name=f"`{prefix}logban <numbanback> <toJson/toDict> <extra note>`", value="Log a ban entry", inline=False)
+        embed.add_field(name=f"`{prefix}banlogshow`", value="Display the ban logs", inline=False)
+        embed.add_field(name=f"`{prefix}search <user> <words> <kind:deleted/edited/ban>`", value="Search deleted and edited messages and ban logs", inline=False)
+        embed.add_field(name=f"`{prefix}archive <hours/stats> <channelID>`", value="Export archived messages from the last few hours", inline=False)
+        embed.add_field(name=f"`{prefix}lockchannel <option> <channelID>`", value="Lock a channel", inline=False)
+        embed.add_field(name=f"`{prefix}lockdown <server/category/channel> <ID>`", value="Lock many channels at once", inline=False)
+        embed.add_field(name=f"`{prefix}unlock <server/category/channel> <ID>`", value="Restore channels to how they were before the lockdown", inline=False)
+        embed.add_field(name=f"`{prefix}timeout <user> <time> <toJson/toDict> <reason>`", value="Timeout a user", inline=False)
+        embed.add_field(name=f"`{prefix}untimeout <user>`", value="Remove a timeout early", inline=False)
+        embed.add_field(name=f"`{prefix}tempban <user> <time> <reason>`", value="Ban a user for a limited time", inline=False)
+        embed.add_field(name=f"`{prefix}mute <user> <time> <reason>`", value="Give a user the mute role for a limited time", inline=False)
+        embed.add_field(name=f"`{prefix}unmute <user>`", value="Remove a mute early", inline=False)
+        embed.add_field(name=f"`{prefix}punishments`", value="Show active timed punishments", inline=False)
+        embed.add_field(name=f"`{prefix}sys --b`", value="Display detailed system information", inline=False)
+        embed.add_field(name=f"`{prefix}config <show/set/reload> <key> <value>`", value="View or change the bot settings for this server", inline=False)
+        embed.add_field(name=f"`{prefix}automod <words/regexes> <add/remove/list> <value>`", value="Manage the automod word and regex lists", inline=False)
+        embed.add_field(name=f"`{prefix}raid <status/end/lockadd/lockremove> <channelID>`", value="Check raid mode or manage the channels it locks", inline=False)
         
         embed.set_footer(text="Only users with administrator permissions can use these commands")
         
         await ctx.send(embed=embed)
     
-    @commands.command(name="sys")
-    async def system_info(self, ctx, flag=None):
-        if flag != "--b":
-            return await ctx.send("Please use `$sys --b` to get system information.")
+    @commands.hybrid_command(name="sys", description="Display detailed system information")
+    async def system_info(self, ctx, flag: Optional[str] = None):
+        # The flag guards against typing $sys by accident, /sys is explicit enough without it
+        if ctx.interaction is None and flag != "--b":
+            return await ctx.send(f"Please use `{guild_settings(ctx.guild)['prefix']}sys --b` to get system information.")
         
         # Get system information
         try:
@@ -247,25 +1659,13 @@ class StaffCommands(commands.Cog):
                 timestamp=datetime.utcnow()
             )
             
-            # System information
-            embed.add_field(
-                name="System",
-                value=f"OS: {platform.system()} {platform.release()}\n"
-                      f"Version: {platform.version()}\n"
-                      f"Architecture: {platform.machine()}\n"
-                      f"Processor: {platform.processor()}",
-                inline=False
-            )
+            await acknowledge(ctx)
             
-            # Python information
-            embed.add_field(
-                name="Python",
-                value=f"Version: {platform.python_version()}\n"
-                      f"Implementation: {platform.python_implementation()}\n"
-                      f"Compiler: {platform.python_compiler()}\n"
-                      f"Build: {' '.join(platform.python_build())}",
-                inline=False
-            )
+            # Probing the system blocks, so it runs on a worker thread
+            info = await blocking_work.run(collect_system_info, _name="system_info")
+            
+            embed.add_field(name="System", value=info["system"], inline=False)
+            embed.add_field(name="Python", value=info["python"], inline=False)
             
             # Discord.py information
             embed.add_field(
@@ -274,38 +1674,17 @@ class StaffCommands(commands.Cog):
                 inline=False
             )
             
-            # Memory usage
-            process = psutil.Process(os.getpid())
-            memory_usage = process.memory_info().rss / 1024 / 1024  # Convert to MB
-            
-            embed.add_field(
-                name="Resource Usage",
-                value=f"Memory: {memory_usage:.2f} MB\n"
-                      f"CPU Usage: {psutil.cpu_percent()}%\n"
-                      f"Available Memory: {psutil.virtual_memory().available / 1024 / 1024:.2f} MB / {psutil.virtual_memory().total / 1024 / 1024:.2f} MB\n"
-                      f"Disk Usage: {psutil.disk_usage('/').percent}%",
-                inline=False
-            )
+            embed.add_field(name="Resource Usage", value=info["resources"], inline=False)
             
-            # Network information
-            if hasattr(psutil, 'net_if_addrs'):
-                network_info = psutil.net_if_addrs()
-                network_text = ""
-                for interface, addresses in network_info.items():
-                    for address in addresses:
-                        if address.family == psutil.AF_LINK:
-                            network_text += f"Interface: {interface}, MAC: {address.address}\n"
-                        elif address.family == 2:  # IPv4
-                            network_text += f"Interface: {interface}, IPv4: {address.address}\n"
-                
+            if info["network"] is not None:
                 embed.add_field(
                     name="Network",
-                    value=network_text if network_text else "No network information available",
+                    value=info["network"] if info["network"] else "No network information available",
                     inline=False
                 )
             
             # Bot information
-            uptime = datetime.utcnow() - datetime.fromtimestamp(process.create_time())
+            uptime = datetime.utcnow() - datetime.utcfromtimestamp(info["process_started"])
             hours, remainder = divmod(int(uptime.total_seconds()), 3600)
             minutes, seconds = divmod(remainder, 60)
             
@@ -327,16 +1706,30 @@ class StaffCommands(commands.Cog):
                 inline=False
 )
 
+            # Event loop health and the work moved off it
+            work_text = f"Loop Lag: {loop_lag_monitor.last_lag * 1000:.1f}ms (max {loop_lag_monitor.max_lag * 1000:.1f}ms)\n"
+            for name, (count, total, longest) in sorted(blocking_work.timings.items()):
+                work_text += f"{name}: {count}x, avg {total / count * 1000:.1f}ms, max {longest * 1000:.1f}ms\n"
+            embed.add_field(name="Event Loop", value=work_text, inline=False)
+            
+            # Slowest commands first, ack is the first response or defer, result is when the command finished
+            slowest = sorted(command_timings.timings.items(), key=lambda item: item[1][3] / item[1][0], reverse=True)[:10]
+            commands_text = ""
+            for name, (count, ack_total, ack_max, result_total, result_max) in slowest:
+                commands_text += f"{name}: {count}x, ack {ack_total / count * 1000:.0f}ms (max {ack_max * 1000:.0f}), result {result_total / count * 1000:.0f}ms (max {result_max * 1000:.0f})\n"
+            embed.add_field(name="Command Timings", value=commands_text or "No commands run yet", inline=False)
             
             await ctx.send(embed=embed)
             
         except Exception as e:
             await ctx.send(f"An error occurred while fetching system information: {e}")
 
-    @commands.command(name="ban")
-    async def ban(self, ctx, user: discord.Member, *, reason="No reason provided"):
+    @commands.hybrid_command(name="ban", description="Ban a user from the server")
+    async def ban(self, ctx, user: discord.Member, *, reason: str = "No reason provided"):
         try:
             await user.ban(reason=reason)
+            # A permanent ban replaces any tempban still waiting to be lifted
+            punishment_scheduler.cancel(ctx.guild.id, user.id, "ban")
             
             # Create ban embed
             embed = Embed(
@@ -353,25 +1746,47 @@ class StaffCommands(commands.Cog):
             
             await ctx.send(embed=embed)
             
-            # Add to ban logs
-            self.ban_logs.append({
-                "user_id": user.id,
-                "user_name": user.name,
-                "moderator_id": ctx.author.id,
-                "moderator_name": ctx.author.name,
-                "reason": reason,
-                "timestamp": datetime.utcnow().isoformat()
-            })
+            self.log_ban(user, ctx.author, reason)
             
         except discord.Forbidden:
             await ctx.send("I don't have permission to ban that user.")
         except Exception as e:
             await ctx.send(f"An error occurred: {e}")
     
-    @commands.command(name="logban")
-    async def logban(self, ctx, num_ban_back: int, format_type: str, *, extra_note=""):
+    # Add to ban logs
+    def log_ban(self, user, moderator, reason):
+        # The oldest entry is about to fall out of the buffer, take it out of the index with it
+        if len(self.ban_logs) == self.ban_logs.maxlen:
+            doc_id = self.ban_doc_ids[0]
+            if doc_id is not None:
+                search_index.remove(doc_id)
+        
+        self.ban_logs.append({
+            "user_id": user.id,
+            "user_name": user.name,
+            "moderator_id": moderator.id,
+            "moderator_name": moderator.name,
+            "reason": reason,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+        
+        doc_id = None
+        guild = getattr(user, "guild", None)
+        if guild is not None:
+            doc_id = search_index.add(
+                "ban",
+                guild.id,
+                None,
+                (user.id, moderator.id),
+                f"{user.name} {moderator.name} {reason}",
+                f"{user.name} banned by {moderator.name}: {reason}"
+            )
+        self.ban_doc_ids.append(doc_id)
+    
+    @commands.hybrid_command(name="logban", description="Log a ban entry")
+    async def logban(self, ctx, num_ban_back: int, format_type: str, *, extra_note: str = ""):
         if not self.ban_logs or num_ban_back > len(self.ban_logs) or num_ban_back < 1:
-            return await ctx.send("Invalid ban index. Please check the ban logs using `$banlogshow`.")
+            return await ctx.send(f"Invalid ban index. Please check the ban logs using `{guild_settings(ctx.guild)['prefix']}banlogshow`.")
         
         ban_index = len(self.ban_logs) - num_ban_back
         ban_entry = self.ban_logs[ban_index]
@@ -382,7 +1797,7 @@ class StaffCommands(commands.Cog):
                 ban_entry["extra_note"] = extra_note
             
             # Format as JSON
-            formatted_entry = json.dumps(ban_entry, indent=2)
+            formatted_entry = await blocking_work.run(json.dumps, ban_entry, indent=2, _name="format_log")
             
             # Send as code block
             await ctx.send(f"```json\n{formatted_entry}\n```")
@@ -401,7 +1816,7 @@ class StaffCommands(commands.Cog):
         else:
             await ctx.send("Invalid format type. Please use 'toJson' or 'toDict'.")
     
-    @commands.command(name="banlogshow")
+    @commands.hybrid_command(name="banlogshow", description="Display the ban logs")
     async def banlogshow(self, ctx):
         if not self.ban_logs:
             return await ctx.send("No ban logs found.")
@@ -428,25 +1843,120 @@ class StaffCommands(commands.Cog):
         
         await ctx.send(embed=embed)
     
-    @commands.command(name="lockchannel")
-    async def lockchannel(self, ctx, option="current", channel_id=None):
+    @commands.hybrid_command(name="search", description="Search deleted and edited messages and ban logs")
+    async def search(self, ctx, user: Optional[discord.User] = None, *, query: str = ""):
+        # "kind:deleted", "kind:edited" or "kind:ban" narrows the results
+        kind = None
+        terms = []
+        for word in query.split():
+            if word.lower().startswith("kind:"):
+                kind = word[5:].lower()
+            else:
+                terms.append(word)
+        
+        if user is None and not terms:
+            return await ctx.send("Please provide a user, search terms or both.")
+        
+        start = time.perf_counter()
+        results, total = search_index.search(ctx.guild.id, user.id if user else None, " ".join(terms), kind)
+        elapsed = time.perf_counter() - start
+        
+        embed = Embed(
+            title="Search Results",
+            description=f"Found {total} entries" + (f", showing the newest {len(results)}" if total > len(results) else ""),
+            color=0x2F3136,
+            timestamp=datetime.utcnow()
+        )
+        
+        embed.set_author(name=bot.user.name, icon_url=bot.user.avatar.url if bot.user.avatar else None)
+        
+        for document in results:
+            where = f" in <#{document['channel_id']}>" if document["channel_id"] else ""
+            users = ", ".join(f"<@{user_id}>" for user_id in document["user_ids"])
+            embed.add_field(
+                name=document["kind"].title(),
+                value=f"{users}{where} • <t:{int(document['timestamp'])}:R>\n{(document['summary'] or '*No content*')[:200]}",
+                inline=False
+            )
+        
+        embed.set_footer(text=f"Searched in {elapsed * 1000:.3f} ms")
+        
+        await ctx.send(embed=embed)
+    
+    @commands.hybrid_command(name="archive", description="Export archived messages from the last few hours")
+    async def archive(self, ctx, hours: str = "stats", channel_id: Optional[str] = None):
+        if ARCHIVE_MODE == "off":
+            return await ctx.send("The message archive is turned off.")
+        
+        if hours.lower() == "stats":
+            stats = message_archive.stats
+            amplification = stats["written_bytes"] / stats["raw_bytes"] if stats["raw_bytes"] else 0
+            
+            embed = Embed(
+                title="Message Archive",
+                description=f"Mode: {ARCHIVE_MODE}",
+                color=0x2F3136,
+                timestamp=datetime.utcnow()
+            )
+            
+            embed.set_author(name=bot.user.name, icon_url=bot.user.avatar.url if bot.user.avatar else None)
+            embed.add_field(name="Records", value=f"{stats['records']:,}", inline=True)
+            embed.add_field(name="Blocks", value=f"{stats['blocks']:,}", inline=True)
+            embed.add_field(name="Segments", value=f"{len(message_archive.segment_paths()):,}", inline=True)
+            embed.add_field(
+                name="Since Startup",
+                value=f"Raw: {stats['raw_bytes'] / 1024:.1f} KB\n"
+                      f"Written: {stats['written_bytes'] / 1024:.1f} KB\n"
+                      f"Write amplification: {amplification:.2f}x",
+                inline=False
+            )
+            
+            return await ctx.send(embed=embed)
+        
+        try:
+            hours_back = float(hours)
+            channel = int(channel_id.strip("<#>")) if channel_id else None
+        except ValueError:
+            return await ctx.send("Please use a number of hours and an optional channel ID.")
+        
+        await acknowledge(ctx)
+        
+        end_ts = time.time()
+        try:
+            records = await blocking_work.run(message_archive.read_range, end_ts - hours_back * 3600, end_ts, channel, _timeout=120, _name="archive_read")
+        except (ExecutorBusy, asyncio.TimeoutError):
+            return await ctx.send("The archive is busy, please try again later.")
+        records = [record for record in records if record.get("guild_id") == ctx.guild.id]
+        
+        if not records:
+            return await ctx.send("No archived messages found for that range.")
+        
+        data = "\n".join(json.dumps(record) for record in records).encode("utf-8")
+        await ctx.send(
+            f"Found {len(records)} archived records.",
+            file=discord.File(io.BytesIO(data), filename="archive.jsonl")
+        )
+    
+    @commands.hybrid_command(name="lockchannel", description="Lock a channel")
+    async def lockchannel(self, ctx, option: str = "current", channel_id: Optional[str] = None):
         # Determine the channel to lock
         if option.lower() == "current":
             channel = ctx.channel
         elif channel_id:
+            # Only channels of this server can be locked from here
             try:
-                channel = await bot.fetch_channel(int(channel_id))
-            except:
+                channel = ctx.guild.get_channel(int(channel_id.strip("<#>")))
+            except ValueError:
+                channel = None
+            if channel is None or isinstance(channel, discord.CategoryChannel):
                 return await ctx.send("Invalid channel ID.")
         else:
             return await ctx.send("Please specify a valid channel option.")
         
-        # Get the default role (@everyone)
-        default_role = ctx.guild.default_role
-        
         try:
-            # Set permissions to deny sending messages for @everyone
-            await channel.set_permissions(default_role, send_messages=False)
+            result = await lockdown_manager.lock(ctx.guild, [channel])
+            if result.failed:
+                raise result.failed[0][1]
             
             embed = Embed(
                 title="Channel Locked",
@@ -465,31 +1975,97 @@ class StaffCommands(commands.Cog):
         except Exception as e:
             await ctx.send(f"An error occurred: {e}")
     
-    @commands.command(name="timeout")
-    async def timeout(self, ctx, user: discord.Member, time: str, log_format=None, *, reason="No reason provided"):
-        # Parse time string (e.g., "1h", "30m", "1d")
-        duration = 0
-        
-        if time.endswith("s"):
-            duration = int(time[:-1])
-        elif time.endswith("m"):
-            duration = int(time[:-1]) * 60
-        elif time.endswith("h"):
-            duration = int(time[:-1]) * 3600
-        elif time.endswith("d"):
-            duration = int(time[:-1]) * 86400
-        else:
+    # Resolve the channels a lockdown or unlock applies to
+    async def resolve_lockdown_target(self, ctx, scope, target_id):
+        scope = scope.lower()
+        
+        if scope in ("server", "guild"):
+            return [channel for channel in ctx.guild.channels if not isinstance(channel, discord.CategoryChannel)]
+        
+        if scope == "category":
             try:
-                duration = int(time)
-            except:
-                return await ctx.send("Invalid time format. Use format like 30s, 5m, 2h, 1d.")
+                category = ctx.guild.get_channel(int(target_id)) if target_id else ctx.channel.category
+            except ValueError:
+                category = None
+            if not isinstance(category, discord.CategoryChannel):
+                await ctx.send("Invalid category ID.")
+                return None
+            return list(category.channels)
+        
+        if scope == "channel":
+            try:
+                channel = ctx.guild.get_channel(int(target_id.strip("<#>"))) if target_id else ctx.channel
+            except ValueError:
+                channel = None
+            if channel is None or isinstance(channel, discord.CategoryChannel):
+                await ctx.send("Invalid channel ID.")
+                return None
+            return [channel]
+        
+        await ctx.send("Please use 'server', 'category' or 'channel'.")
+        return None
+    
+    def create_lockdown_embed(self, ctx, title, result, color):
+        settings = guild_settings(ctx.guild)
+        
+        embed = Embed(
+            title=title,
+            description=f"{len(result.changed)} channels updated, {len(result.skipped)} skipped, {len(result.failed)} failed.",
+            color=color,
+            timestamp=datetime.utcnow()
+        )
+        
+        embed.set_author(name=bot.user.name, icon_url=bot.user.avatar.url if bot.user.avatar else None)
+        embed.add_field(name="Moderator", value=ctx.author.mention, inline=True)
+        embed.add_field(name="Time Taken", value=f"{result.elapsed:.2f}s", inline=True)
+        
+        if result.failed:
+            failed = "\n".join(f"{channel.mention}: {error.text or error.status}" for channel, error in result.failed[:10])
+            embed.add_field(name="Failed", value=failed, inline=False)
+        
+        embed.set_footer(text=settings["footer"])
+        
+        return embed
+    
+    @commands.hybrid_command(name="lockdown", description="Lock many channels at once")
+    async def lockdown(self, ctx, scope: str = "server", target_id: Optional[str] = None):
+        channels = await self.resolve_lockdown_target(ctx, scope, target_id)
+        if channels is None:
+            return
+        
+        await acknowledge(ctx)
+        result = await lockdown_manager.lock(ctx.guild, channels)
+        await ctx.send(embed=self.create_lockdown_embed(ctx, "Lockdown Started", result, 0xFF0000))
+    
+    @commands.hybrid_command(name="unlock", description="Restore channels to how they were before the lockdown")
+    async def unlock(self, ctx, scope: str = "server", target_id: Optional[str] = None):
+        # A server-wide unlock restores every channel with a snapshot
+        if scope.lower() in ("server", "guild"):
+            channels = None
+        else:
+            channels = await self.resolve_lockdown_target(ctx, scope, target_id)
+            if channels is None:
+                return
+        
+        await acknowledge(ctx)
+        result = await lockdown_manager.unlock(ctx.guild, channels)
+        await ctx.send(embed=self.create_lockdown_embed(ctx, "Lockdown Lifted", result, 0x00FF00))
+    
+    @commands.hybrid_command(name="timeout", description="Timeout a user")
+    async def timeout(self, ctx, user: discord.Member, time: str, log_format: Optional[str] = None, *, reason: str = "No reason provided"):
+        duration = parse_duration(time)
+        if duration is None or duration <= 0:
+            return await ctx.send("Invalid time format. Use format like 30s, 5m, 2h, 1d.")
         
         # Calculate timeout end time
-        timeout_until = datetime.utcnow() + datetime.timedelta(seconds=duration)
+        timeout_until = datetime.utcnow() + timedelta(seconds=duration)
         
         try:
-            # Apply timeout
-            await user.timeout(timeout_until, reason=reason)
+            # Apply timeout, anything past Discord's limit is renewed by the scheduler
+            native_duration, renew_in = split_timeout(duration)
+            await user.timeout(timedelta(seconds=native_duration), reason=reason)
+            
+            punishment_scheduler.schedule(ctx.guild.id, user.id, "timeout", duration, run_in=renew_in, reason=reason)
             
             # Create timeout embed
             embed = Embed(
@@ -505,41 +2081,246 @@ class StaffCommands(commands.Cog):
             embed.add_field(name="Duration", value=time, inline=True)
             embed.add_field(name="Reason", value=reason, inline=False)
             
-            await ctx.send(embed=embed)
+            await ctx.send(embed=embed)
+            
+            # Log format if requested
+            if log_format:
+                timeout_log = {
+                    "user_id": user.id,
+                    "user_name": user.name,
+                    "moderator_id": ctx.author.id,
+                    "moderator_name": ctx.author.name,
+                    "duration": time,
+                    "reason": reason,
+                    "timestamp": datetime.utcnow().isoformat(),
+                    "expires": timeout_until.isoformat()
+                }
+                
+                if log_format.lower() == "tojson":
+                    formatted_log = await blocking_work.run(json.dumps, timeout_log, indent=2, _name="format_log")
+                    await ctx.send(f"```json\n{formatted_log}\n```")
+                    
+                elif log_format.lower() == "todict":
+                    formatted_log = str(timeout_log).replace("{", "{\n  ").replace("}", "\n}").replace(", ", ",\n  ")
+                    await ctx.send(f"```python\n{formatted_log}\n```")
+            
+        except discord.Forbidden:
+            await ctx.send("I don't have permission to timeout that user.")
+        except Exception as e:
+            await ctx.send(f"An error occurred: {e}")
+
+    @commands.hybrid_command(name="untimeout", description="Remove a timeout early")
+    async def untimeout(self, ctx, user: discord.Member):
+        try:
+            await user.timeout(None, reason=f"Timeout removed by {ctx.author.name}")
+        except discord.Forbidden:
+            return await ctx.send("I don't have permission to timeout that user.")
+        
+        punishment_scheduler.cancel(ctx.guild.id, user.id, "timeout")
+        await ctx.send(f"{user.mention}'s timeout has been removed.")
+    
+    @commands.hybrid_command(name="tempban", description="Ban a user for a limited time")
+    async def tempban(self, ctx, user: discord.Member, time: str, *, reason: str = "No reason provided"):
+        duration = parse_duration(time)
+        if duration is None or duration <= 0:
+            return await ctx.send("Invalid time format. Use format like 30s, 5m, 2h, 1d.")
+        
+        try:
+            await user.ban(reason=reason)
+        except discord.Forbidden:
+            return await ctx.send("I don't have permission to ban that user.")
+        
+        punishment_scheduler.schedule(ctx.guild.id, user.id, "ban", duration, reason=reason)
+        self.log_ban(user, ctx.author, reason)
+        
+        embed = Embed(
+            title="User Temporarily Banned",
+            description=f"{user.mention} has been banned from the server.",
+            color=0xFF0000,
+            timestamp=datetime.utcnow()
+        )
+        
+        embed.set_author(name=bot.user.name, icon_url=bot.user.avatar.url if bot.user.avatar else None)
+        embed.add_field(name="User", value=f"{user.name} ({user.id})", inline=True)
+        embed.add_field(name="Moderator", value=ctx.author.mention, inline=True)
+        embed.add_field(name="Duration", value=time, inline=True)
+        embed.add_field(name="Reason", value=reason, inline=False)
+        
+        await ctx.send(embed=embed)
+    
+    @commands.hybrid_command(name="mute", description="Give a user the mute role for a limited time")
+    async def mute(self, ctx, user: discord.Member, time: str, *, reason: str = "No reason provided"):
+        duration = parse_duration(time)
+        if duration is None or duration <= 0:
+            return await ctx.send("Invalid time format. Use format like 30s, 5m, 2h, 1d.")
+        
+        settings = guild_settings(ctx.guild)
+        role = ctx.guild.get_role(settings["mute_role_id"] or 0)
+        if not role:
+            return await ctx.send(f"No mute role set. Use `{settings['prefix']}config set mute_role_id <roleID>` first.")
+        
+        try:
+            await user.add_roles(role, reason=reason)
+        except discord.Forbidden:
+            return await ctx.send("I don't have permission to give that role.")
+        
+        punishment_scheduler.schedule(ctx.guild.id, user.id, "mute", duration, role_id=role.id, reason=reason)
+        
+        embed = Embed(
+            title="User Muted",
+            description=f"{user.mention} has been muted.",
+            color=0xFFA500,
+            timestamp=datetime.utcnow()
+        )
+        
+        embed.set_author(name=bot.user.name, icon_url=bot.user.avatar.url if bot.user.avatar else None)
+        embed.add_field(name="User", value=f"{user.name} ({user.id})", inline=True)
+        embed.add_field(name="Moderator", value=ctx.author.mention, inline=True)
+        embed.add_field(name="Duration", value=time, inline=True)
+        embed.add_field(name="Reason", value=reason, inline=False)
+        
+        await ctx.send(embed=embed)
+    
+    @commands.hybrid_command(name="unmute", description="Remove a mute early")
+    async def unmute(self, ctx, user: discord.Member):
+        punishment = punishment_scheduler.cancel(ctx.guild.id, user.id, "mute")
+        role = ctx.guild.get_role(punishment["role_id"] if punishment else guild_settings(ctx.guild)["mute_role_id"] or 0)
+        
+        if role:
+            try:
+                await user.remove_roles(role, reason=f"Mute removed by {ctx.author.name}")
+            except discord.Forbidden:
+                return await ctx.send("I don't have permission to remove that role.")
+        
+        await ctx.send(f"{user.mention} has been unmuted.")
+    
+    @commands.hybrid_command(name="punishments", description="Show active timed punishments")
+    async def punishments(self, ctx):
+        active = punishment_scheduler.for_guild(ctx.guild.id)
+        if not active:
+            return await ctx.send("No active timed punishments.")
+        
+        embed = Embed(
+            title="Active Punishments",
+            description=f"Showing {min(len(active), 25)} of {len(active)} timed punishments",
+            color=0x2F3136,
+            timestamp=datetime.utcnow()
+        )
+        
+        embed.set_author(name=bot.user.name, icon_url=bot.user.avatar.url if bot.user.avatar else None)
+        
+        for punishment in active[:25]:
+            embed.add_field(
+                name=f"{punishment['kind'].title()} • {punishment['user_id']}",
+                value=f"User: <@{punishment['user_id']}>\n"
+                      f"Expires: <t:{int(punishment['expires_at'])}:R>\n"
+                      f"Reason: {punishment['reason'] or 'No reason provided'}",
+                inline=False
+            )
+        
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="config", description="View or change the bot settings for this server")
+    async def config(self, ctx, action: str = "show", key: Optional[str] = None, *, value: Optional[str] = None):
+        if not ctx.guild:
+            return await ctx.send("This command can only be used in a server.")
+        
+        action = action.lower()
+        
+        if action == "reload":
+            if not guild_config.load():
+                return await ctx.send("The settings file has errors (see the log), the previous settings are still used.")
+            return await ctx.send("Settings reloaded from disk.")
+        
+        if action == "set":
+            if value is None:
+                return await ctx.send("Please provide a value.")
+            if isinstance(DEFAULT_GUILD_CONFIG.get(key), list):
+                return await ctx.send(f"Use `{guild_settings(ctx.guild)['prefix']}automod` or `{guild_settings(ctx.guild)['prefix']}raid` to change lists.")
+            
+            try:
+                value = parse_setting(key, value)
+            except ValueError as e:
+                return await ctx.send(str(e))
+            
+            try:
+                guild_config.set(ctx.guild.id, key, value)
+            except OSError as e:
+                return await ctx.send(f"An error occurred while saving the settings: {e}")
+        
+        elif action != "show":
+            return await ctx.send("Invalid action. Please use 'show', 'set' or 'reload'.")
+        
+        settings = guild_settings(ctx.guild)
+        
+        embed = Embed(
+            title="Server Settings",
+            description=f"Current bot settings for {ctx.guild.name}",
+            color=0x2F3136,
+            timestamp=datetime.utcnow()
+        )
+        
+        embed.set_author(name=settings["author_name"], icon_url=bot.user.avatar.url if bot.user.avatar else None)
+        
+        for setting, setting_value in settings.items():
+            if setting.endswith("role_id") and setting_value:
+                setting_value = f"<@&{setting_value}> ({setting_value})"
+            elif setting.endswith("_id") and setting_value:
+                setting_value = f"<#{setting_value}> ({setting_value})"
+            elif isinstance(setting_value, list):
+                setting_value = f"{len(setting_value)} entries"
+            embed.add_field(name=setting, value=f"{setting_value}" if setting_value is not None else "Not set", inline=False)
+        
+        embed.set_footer(text=settings["footer"])
+        
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="raid", description="Check raid mode or manage the channels it locks")
+    async def raid(self, ctx, action: str = "status", channel_id: Optional[str] = None):
+        if not ctx.guild:
+            return await ctx.send("This command can only be used in a server.")
+        
+        action = action.lower()
+        
+        if action == "status":
+            return await ctx.send(embed=raid_guard.create_status_embed(ctx.guild))
+        
+        if action == "end":
+            if not raid_guard.is_active(ctx.guild.id):
+                return await ctx.send("Raid mode is not active.")
+            await raid_guard.end_raid(ctx.guild)
+            return await ctx.send("Raid mode ended. Welcome messages resumed and locked channels were reopened.")
+        
+        if action in ("lockadd", "lockremove"):
+            try:
+                channel_id = int(channel_id.strip("<#>")) if channel_id else ctx.channel.id
+            except ValueError:
+                return await ctx.send("Invalid channel ID.")
+            
+            channel_ids = list(guild_settings(ctx.guild)["raid_lock_channel_ids"])
+            if action == "lockadd" and channel_id not in channel_ids:
+                channel_ids.append(channel_id)
+            elif action == "lockremove" and channel_id in channel_ids:
+                channel_ids.remove(channel_id)
             
-            # Log format if requested
-            if log_format:
-                timeout_log = {
-                    "user_id": user.id,
-                    "user_name": user.name,
-                    "moderator_id": ctx.author.id,
-                    "moderator_name": ctx.author.name,
-                    "duration": time,
-                    "reason": reason,
-                    "timestamp": datetime.utcnow().isoformat(),
-                    "expires": timeout_until.isoformat()
-                }
-                
-                if log_format.lower() == "tojson":
-                    formatted_log = json.dumps(timeout_log, indent=2)
-                    await ctx.send(f"```json\n{formatted_log}\n```")
-                    
-                elif log_format.lower() == "todict":
-                    formatted_log = str(timeout_log).replace("{", "{\n  ").replace("}", "\n}").replace(", ", ",\n  ")
-                    await ctx.send(f"```python\n{formatted_log}\n```")
+            try:
+                guild_config.set(ctx.guild.id, "raid_lock_channel_ids", channel_ids)
+            except OSError as e:
+                return await ctx.send(f"An error occurred while saving the settings: {e}")
             
-        except discord.Forbidden:
-            await ctx.send("I don't have permission to timeout that user.")
-        except Exception as e:
-            await ctx.send(f"An error occurred: {e}")
+            return await ctx.send(f"Raid mode will lock {len(channel_ids)} channels.")
+        
+        await ctx.send("Invalid action. Please use 'status', 'end', 'lockadd' or 'lockremove'.")
 
 # Member Commands
 class MemberCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
     
-    @commands.command(name="memberhelp")
+    @commands.hybrid_command(name="memberhelp", description="Show the member commands")
     async def member_help(self, ctx):
+        prefix = guild_settings(ctx.guild)["prefix"]
+        
         embed = Embed(
             title="Member Commands",
             description="Here are the commands available to all members:",
@@ -547,20 +2328,22 @@ class MemberCommands(commands.Cog):
             timestamp=datetime.utcnow()
         )
         
-        embed.set_author(name="GDPM Server Management", icon_url=bot.user.avatar.url if bot.user.avatar else None)
+        embed.set_author(name=guild_settings(ctx.guild)["author_name"], icon_url=bot.user.avatar.url if bot.user.avatar else None)
         
-        embed.add_field(name="`$membercount`", value="Show current member count", inline=False)
-        embed.add_field(name="`$avatar <user>`", value="Display your avatar or another user's avatar", inline=False)
-        embed.add_field(name="`$links`", value="Display important links", inline=False)
-        embed.add_field(name="`$snipe <numback>`", value=" Check the most recent deleted message or a specefic message.", inline=False)
-        embed.add_field(name="`$esnipe <numback>`", value="Check the most recent edited message or an older edit.", inline=False)
-        embed.add_field(name="`$serverinfo`", value="Display server statistics", inline=False)
+        embed.add_field(name=f"`{prefix}membercount`", value="Show current member count", inline=False)
+        embed.add_field(name=f"`{prefix}avatar <user>`", value="Display your avatar or another user's avatar", inline=False)
+        embed.add_field(name=f"`{prefix}links`", value="Display important links", inline=False)
+        embed.add_field(name=f"`{prefix}snipe <numback>`", value=" Check the most recent deleted message or a specefic message.", inline=False)
+        embed.add_field(name=f"`{prefix}esnipe <numback>`", value="Check the most recent edited message or an older edit.", inline=False)
+        embed.add_field(name=f"`{prefix}serverinfo`", value="Display server statistics", inline=False)
+        embed.add_field(name=f"`{prefix}stats <days>`", value="Show member growth, churn, retention and top roles", inline=False)
 
-        embed.set_footer(text="GDPM Server Management")
+        embed.set_footer(text=guild_settings(ctx.guild)["footer"])
         
         await ctx.send(embed=embed)
 
-    @commands.command(name="membercount")
+    @commands.hybrid_command(name="membercount", description="Show current member count")
+    @commands.guild_only()
     async def membercount(self, ctx):
         member_count = ctx.guild.member_count
         
@@ -572,12 +2355,12 @@ class MemberCommands(commands.Cog):
         )
         
         embed.set_author(name=ctx.guild.name, icon_url=ctx.guild.icon.url if ctx.guild.icon else None)
-        embed.set_footer(text="GDPM Server Management")
+        embed.set_footer(text=guild_settings(ctx.guild)["footer"])
         
         await ctx.send(embed=embed)
     
-    @commands.command(name="avatar")
-    async def avatar(self, ctx, user: discord.User = None):
+    @commands.hybrid_command(name="avatar", description="Display your avatar or another user's avatar")
+    async def avatar(self, ctx, user: Optional[discord.User] = None):
         # If no user is specified, use the command author
         user = user or ctx.author
         
@@ -591,11 +2374,11 @@ class MemberCommands(commands.Cog):
         avatar_url = user.avatar.url if user.avatar else user.default_avatar.url
         
         embed.set_image(url=avatar_url)
-        embed.set_footer(text="GDPM Server Management")
+        embed.set_footer(text=guild_settings(ctx.guild)["footer"])
         
         await ctx.send(embed=embed)
     
-    @commands.command(name="links")
+    @commands.hybrid_command(name="links", description="Display important links")
     async def links(self, ctx):
         embed = Embed(
             title="Important Links",
@@ -604,7 +2387,7 @@ class MemberCommands(commands.Cog):
             timestamp=datetime.utcnow()
         )
         
-        embed.set_author(name="GDPM Server Management", icon_url=bot.user.avatar.url if bot.user.avatar else None)
+        embed.set_author(name=guild_settings(ctx.guild)["author_name"], icon_url=bot.user.avatar.url if bot.user.avatar else None)
         
         # Create view with buttons
         view = View()
@@ -617,7 +2400,7 @@ class MemberCommands(commands.Cog):
         )
         view.add_item(github_button)
 
-        embed.set_footer(text="GDPM Server Management")
+        embed.set_footer(text=guild_settings(ctx.guild)["footer"])
         
         await ctx.send(embed=embed, view=view)
 
@@ -625,10 +2408,15 @@ class MemberCommands(commands.Cog):
 class Misc(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        # Add these lines to track deleted and edited messages
+        self.deleted_messages = {}  # {channel_id: [message1, message2, ...]}
+        self.edited_messages = {}   # {channel_id: [{"before": message1, "after": message2}, ...]}
 
-    @commands.command(name="serverinfo")
+    @commands.hybrid_command(name="serverinfo", description="Display server statistics")
+    @commands.guild_only()
     async def serverinfo(self, ctx):
         guild = ctx.guild
+        await acknowledge(ctx)
         
         # Get server creation date and calculate age
         created_at = guild.created_at
@@ -650,12 +2438,9 @@ class Misc(commands.Cog):
         
         # Get member counts
         total_members = guild.member_count
-        bot_count = sum(1 for member in guild.members if member.bot)
+        bot_count, online_members = await blocking_work.run(count_members, guild.members, _name="count_members")
         human_count = total_members - bot_count
         
-        # Get online members count
-        online_members = sum(1 for member in guild.members if member.status != discord.Status.offline and not member.bot)
-        
         # Security level
         verification_level = str(guild.verification_level).title()
         
@@ -723,185 +2508,827 @@ class Misc(commands.Cog):
         # Send embed
         await ctx.send(embed=embed)
 
-def __init__(self, bot):
-    self.bot = bot
-    # Add these lines to track deleted and edited messages
-    self.deleted_messages = {}  # {channel_id: [message1, message2, ...]}
-    self.edited_messages = {}   # {channel_id: [{"before": message1, "after": message2}, ...]}
+    @commands.hybrid_command(name="stats", description="Show member growth, churn, retention and top roles")
+    @commands.guild_only()
+    async def stats(self, ctx, days: int = 30):
+        if days < 1:
+            return await ctx.send("Days must be at least 1.")
+        
+        await acknowledge(ctx)
+        
+        try:
+            # Take the first snapshot now instead of waiting for the loop
+            if not member_analytics.snapshot_paths(ctx.guild.id):
+                await take_member_snapshot(ctx.guild)
+            report = await blocking_work.run(member_analytics.report, ctx.guild.id, days, time.time(), _cpu=True, _timeout=120, _name="stats")
+        except (ExecutorBusy, asyncio.TimeoutError):
+            return await ctx.send("The bot is busy right now, try again in a moment.")
+        except OSError as e:
+            return await ctx.send(f"An error occurred while reading the member snapshots: {e}")
+        
+        if report is None:
+            return await ctx.send(f"No member snapshots from the last {days} days yet.")
+        
+        embed = Embed(
+            title=f"{ctx.guild.name} Stats",
+            description=f"Based on {report['snapshots']} snapshots since <t:{int(report['since'])}:R>",
+            color=0x2F3136,
+            timestamp=datetime.utcnow()
+        )
+        
+        embed.add_field(
+            name="Members",
+            value=f"👥 Members: {report['members']:,}\n"
+                  f"👤 Humans: {report['humans']:,}\n"
+                  f"🤖 Bots: {report['bots']:,}",
+            inline=True
+        )
+        
+        embed.add_field(
+            name="Growth",
+            value=f"📈 Net: {report['growth']:+,}\n"
+                  f"📥 Joined: {report['joined']:,}\n"
+                  f"📤 Left: {report['left']:,}",
+            inline=True
+        )
+        
+        # Bucket labels match ACCOUNT_AGE_BUCKETS
+        labels = [f"< {ACCOUNT_AGE_BUCKETS[0]}d"]
+        labels += [f"{low}-{high}d" for low, high in zip(ACCOUNT_AGE_BUCKETS, ACCOUNT_AGE_BUCKETS[1:])]
+        labels.append(f"> {ACCOUNT_AGE_BUCKETS[-1]}d")
+        embed.add_field(
+            name="Account Ages",
+            value="\n".join(f"{label}: {count:,}" for label, count in zip(labels, report["account_ages"])),
+            inline=True
+        )
+        
+        retention_text = ""
+        for weeks, (size, kept) in enumerate(report["retention"]):
+            if size:
+                retention_text += f"Joined {weeks}-{weeks + 1} weeks before: {kept / size:.0%} of {size:,} stayed\n"
+        embed.add_field(name="Retention", value=retention_text or "No join times recorded", inline=False)
+        
+        roles_text = ""
+        for role_id, count in report["roles"].items():
+            role = ctx.guild.get_role(role_id)
+            roles_text += f"{role.mention if role else role_id}: {count:,}\n"
+        embed.add_field(name="Top Roles", value=roles_text or "No roles assigned", inline=False)
+        
+        embed.set_footer(text=f"Aggregated in {report['seconds'] * 1000:.0f}ms • {guild_settings(ctx.guild)['footer']}")
+        
+        await ctx.send(embed=embed)
+
+    # Archive every message when the archive is set to "all"
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if ARCHIVE_MODE == "all" and not message.author.bot:
+            message_archive.append(archive_record("message", message))
 
-# Add this to capture deleted messages
-@commands.Cog.listener()
-async def on_message_delete(self, message):
-    if message.author.bot:
-        return
+    # Add this to capture deleted messages
+    @commands.Cog.listener()
+    async def on_message_delete(self, message):
+        if message.author.bot:
+            return
+        
+        channel_id = message.channel.id
+        if channel_id not in self.deleted_messages:
+            self.deleted_messages[channel_id] = []
+        
+        # Store message information
+        msg_data = {
+            "content": message.content,
+            "author": message.author,
+            "timestamp": message.created_at,
+            "attachments": [a.url for a in message.attachments],
+            "embeds": message.embeds
+        }
+        
+        # Add to the beginning of the list (most recent first)
+        msg_data["doc_id"] = search_index.add(
+            "deleted",
+            message.guild.id if message.guild else None,
+            channel_id,
+            (message.author.id,),
+            message.content,
+            message.content
+        )
+        self.deleted_messages[channel_id].insert(0, msg_data)
+        
+        if ARCHIVE_MODE != "off":
+            message_archive.append(archive_record("delete", message))
+        
+        # Keep only the last 10 deleted messages per channel
+        if len(self.deleted_messages[channel_id]) > 10:
+            search_index.remove(self.deleted_messages[channel_id].pop()["doc_id"])
+
+    # Add this to capture edited messages
+    @commands.Cog.listener()
+    async def on_message_edit(self, before, after):
+        if before.author.bot:
+            return
+        
+        # Ignore if content didn't change
+        if before.content == after.content:
+            return
+        
+        channel_id = before.channel.id
+        if channel_id not in self.edited_messages:
+            self.edited_messages[channel_id] = []
+        
+        # Store message information
+        edit_data = {
+            "before": {
+                "content": before.content,
+                "timestamp": before.created_at,
+            },
+            "after": {
+                "content": after.content,
+                "timestamp": after.edited_at,
+            },
+            "author": before.author,
+            "url": after.jump_url
+        }
+        
+        # Add to the beginning of the list (most recent first)
+        edit_data["doc_id"] = search_index.add(
+            "edited",
+            before.guild.id if before.guild else None,
+            channel_id,
+            (before.author.id,),
+            f"{before.content} {after.content}",
+            f"{before.content} → {after.content}"
+        )
+        self.edited_messages[channel_id].insert(0, edit_data)
+        
+        if ARCHIVE_MODE != "off":
+            message_archive.append(archive_record("edit", after, before=before.content))
+        
+        # Keep only the last 10 edited messages per channel
+        if len(self.edited_messages[channel_id]) > 10:
+            search_index.remove(self.edited_messages[channel_id].pop()["doc_id"])
+
+    @commands.hybrid_command(name="snipe", description="Check the most recent deleted message or an older one")
+    async def snipe(self, ctx, num_back: int = 1):
+        """Show the most recently deleted message in the channel"""
+        channel_id = ctx.channel.id
+        
+        # Check if there are deleted messages in this channel
+        if channel_id not in self.deleted_messages or not self.deleted_messages[channel_id]:
+            return await ctx.send("No recently deleted messages found in this channel.")
+        
+        # Validate the num_back parameter
+        if num_back < 1:
+            return await ctx.send("Please provide a positive number.")
+        
+        if num_back > len(self.deleted_messages[channel_id]):
+            return await ctx.send(f"Only {len(self.deleted_messages[channel_id])} deleted messages are stored for this channel.")
+        
+        # Get the requested deleted message
+        msg_data = self.deleted_messages[channel_id][num_back - 1]
+        
+        # Create embed
+        embed = Embed(
+            title="Deleted Message",
+            description=msg_data["content"] or "*No content*",
+            color=0xFF5555,
+            timestamp=msg_data["timestamp"]
+        )
+        
+        embed.set_author(
+            name=f"{msg_data['author'].name}#{msg_data['author'].discriminator}",
+            icon_url=msg_data['author'].avatar.url if msg_data['author'].avatar else msg_data['author'].default_avatar.url
+        )
+        
+        # Add attachments if any
+        if msg_data["attachments"]:
+            embed.add_field(
+                name="Attachments",
+                value="\n".join(msg_data["attachments"]),
+                inline=False
+            )
+        
+        # Add footer
+        embed.set_footer(text=f"Deleted message {num_back}/{len(self.deleted_messages[channel_id])}")
+        
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name="esnipe", description="Check the most recent edited message or an older edit")
+    async def esnipe(self, ctx, num_back: int = 1):
+        """Show the most recently edited message in the channel"""
+        channel_id = ctx.channel.id
+        
+        # Check if there are edited messages in this channel
+        if channel_id not in self.edited_messages or not self.edited_messages[channel_id]:
+            return await ctx.send("No recently edited messages found in this channel.")
+        
+        # Validate the num_back parameter
+        if num_back < 1:
+            return await ctx.send("Please provide a positive number.")
+        
+        if num_back > len(self.edited_messages[channel_id]):
+            return await ctx.send(f"Only {len(self.edited_messages[channel_id])} edited messages are stored for this channel.")
+        
+        # Get the requested edited message
+        edit_data = self.edited_messages[channel_id][num_back - 1]
+        
+        # Create embed
+        embed = Embed(
+            title="Edited Message",
+            color=0x5865F2,
+            timestamp=edit_data["after"]["timestamp"]
+        )
+        
+        embed.set_author(
+            name=f"{edit_data['author'].name}#{edit_data['author'].discriminator}",
+            icon_url=edit_data['author'].avatar.url if edit_data['author'].avatar else edit_data['author'].default_avatar.url
+        )
+        
+        embed.add_field(
+            name="Before",
+            value=edit_data["before"]["content"] or "*No content*",
+            inline=False
+        )
+        
+        embed.add_field(
+            name="After",
+            value=edit_data["after"]["content"] or "*No content*",
+            inline=False
+        )
+        
+        # Add link to the message
+        embed.add_field(
+            name="Jump to Message",
+            value=f"[Click here]({edit_data['url']})",
+            inline=False
+        )
+        
+        # Add footer
+        embed.set_footer(text=f"Edited message {num_back}/{len(self.edited_messages[channel_id])}")
+        
+        await ctx.send(embed=embed)
+
+    # ^ Misc Cog End
+
+INVITE_PATTERN = r"(?:discord(?:app)?\.com/invite|discord\.gg)/[\w-]+"
+
+# Upper bound on users tracked for flood/duplicate detection, least recently active are dropped first
+AUTOMOD_MAX_TRACKED_USERS = 50000
+
+# Most custom regexes per guild. They share one alternation that re still tries branch by branch,
+# so this keeps the per-message cost of on_message bounded (see benchmarks/bench_automod.py).
+AUTOMOD_MAX_REGEXES = 20
+
+# Splits message content into the tokens looked up in the word set
+_WORD_TOKEN = re.compile(r"\w+")
+
+# All content rules of a guild compiled into one set lookup and a single regex, so scanning a message
+# does not get slower with every word added
+class AutoModMatcher:
+    def __init__(self, settings):
+        parts = []
+        
+        words = {word.lower() for word in settings["automod_words"] if word}
+        
+        # Plain words are checked against the message tokens in a set, which costs the same for 10 or 10000 words.
+        # Only phrases and words with symbols go into the regex.
+        self.word_set = frozenset(word for word in words if _WORD_TOKEN.fullmatch(word))
+        words -= self.word_set
+        
+        if words:
+            # Longest first so a word is never shadowed by a shorter one it starts with
+            alternation = "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+            parts.append(f"(?P<word>(?<!\\w)(?:{alternation})(?!\\w))")
+        
+        for i, pattern in enumerate(settings["automod_regexes"][:AUTOMOD_MAX_REGEXES]):
+            if not is_valid_automod_regex(pattern):
+                log.warning("Skipping invalid automod regex", extra={"pattern": pattern})
+                continue
+            parts.append(f"(?P<regex{i}>{pattern})")
+        
+        if settings["automod_block_invites"]:
+            parts.append(f"(?P<invite>{INVITE_PATTERN})")
+        
+        try:
+            self.pattern = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+        except re.error as e:
+            # A stored rule that slipped past validation (e.g. a hand-edited config) must not take automod down,
+            # fall back to the built-in rules
+            log.error("Error compiling automod rules, ignoring custom regexes", extra={"error": str(e)})
+            parts = [part for part in parts if not part.startswith("(?P<regex")]
+            self.pattern = re.compile("|".join(parts), re.IGNORECASE) if parts else None
     
-    channel_id = message.channel.id
-    if channel_id not in self.deleted_messages:
-        self.deleted_messages[channel_id] = []
+    # Returns the name of the rule that matched, or None
+    def match(self, content):
+        if not content:
+            return None
+        
+        if self.word_set and not self.word_set.isdisjoint(_WORD_TOKEN.findall(content.lower())):
+            return "word"
+        
+        if self.pattern is None:
+            return None
+        
+        found = self.pattern.search(content)
+        if found is None:
+            return None
+        
+        # The rule groups wrap everything else, so the outermost one is reported
+        if found.lastgroup is None:
+            return None
+        return "regex" if found.lastgroup.startswith("regex") else found.lastgroup
+
+# Backreferences by number, which would point at the wrong group once the rule is embedded
+_NUMERIC_BACKREFERENCE = re.compile(r"(?<!\\)(?:\\\\)*\\(?:[1-9]|g<\d)")
+
+# Text a rule regex is tried on to catch patterns that match without consuming anything
+_EMPTY_MATCH_SAMPLES = ("", "hello world", "\n")
+
+# Rule regexes are embedded as groups of a bigger pattern, so they may not bring capturing groups,
+# numbered backreferences or global inline flags of their own. They also have to match actual text,
+# a rule that matches the empty string would fire on every message.
+def is_valid_automod_regex(pattern):
+    if _NUMERIC_BACKREFERENCE.search(pattern):
+        return False
     
-    # Store message information
-    msg_data = {
-        "content": message.content,
-        "author": message.author,
-        "timestamp": message.created_at,
-        "attachments": [a.url for a in message.attachments],
-        "embeds": message.embeds
-    }
+    try:
+        # On its own first, so a pattern can't close the group it is wrapped in (e.g. "x)|(y")
+        compiled = re.compile(pattern, re.IGNORECASE)
+        # Then the way AutoModMatcher embeds it, so placement-dependent errors show up here too
+        re.compile(f"(?P<word>x)|(?P<regex0>{pattern})", re.IGNORECASE)
+    except re.error:
+        return False
     
-    # Add to the beginning of the list (most recent first)
-    self.deleted_messages[channel_id].insert(0, msg_data)
+    # Only (?:...) groups, a capturing group would be reported instead of the rule
+    if compiled.groups:
+        return False
     
-    # Keep only the last 10 deleted messages per channel
-    if len(self.deleted_messages[channel_id]) > 10:
-        self.deleted_messages[channel_id].pop()
+    for sample in _EMPTY_MATCH_SAMPLES:
+        if any(found.end() == found.start() for found in compiled.finditer(sample)):
+            return False
+    return True
 
-# Add this to capture edited messages
-@commands.Cog.listener()
-async def on_message_edit(self, before, after):
-    if before.author.bot:
-        return
+# Automod
+class AutoMod(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.matchers = {}  # {guild_id: (config_version, matcher)}
+        self.recent_messages = OrderedDict()  # {(guild_id, user_id): deque of message times}
+        self.recent_contents = OrderedDict()  # {(guild_id, user_id): deque of (time, content hash)}
     
-    # Ignore if content didn't change
-    if before.content == after.content:
-        return
-        
-    channel_id = before.channel.id
-    if channel_id not in self.edited_messages:
-        self.edited_messages[channel_id] = []
-    
-    # Store message information
-    edit_data = {
-        "before": {
-            "content": before.content,
-            "timestamp": before.created_at,
-        },
-        "after": {
-            "content": after.content,
-            "timestamp": after.edited_at,
-        },
-        "author": before.author,
-        "url": after.jump_url
-    }
+    async def cog_check(self, ctx):
+        # Check if user has administrator permissions
+        return ctx.author.guild_permissions.administrator
     
-    # Add to the beginning of the list (most recent first)
-    self.edited_messages[channel_id].insert(0, edit_data)
+    def get_matcher(self, guild):
+        cached = self.matchers.get(guild.id)
+        if cached and cached[0] == guild_config.version:
+            return cached[1]
+        
+        matcher = AutoModMatcher(guild_settings(guild))
+        self.matchers[guild.id] = (guild_config.version, matcher)
+        return matcher
     
-    # Keep only the last 10 edited messages per channel
-    if len(self.edited_messages[channel_id]) > 10:
-        self.edited_messages[channel_id].pop()
-
-@commands.command(name="snipe")
-async def snipe(self, ctx, num_back: int = 1):
-    """Show the most recently deleted message in the channel"""
-    channel_id = ctx.channel.id
+    # Get the sliding window for a user, evicting the least recently active user when full
+    def get_window(self, windows, key, size):
+        window = windows.get(key)
+        if window is None or window.maxlen != size:
+            window = deque(window or (), maxlen=size)
+            windows[key] = window
+        windows.move_to_end(key)
+        
+        if len(windows) > AUTOMOD_MAX_TRACKED_USERS:
+            windows.popitem(last=False)
+        
+        return window
     
-    # Check if there are deleted messages in this channel
-    if channel_id not in self.deleted_messages or not self.deleted_messages[channel_id]:
-        return await ctx.send("No recently deleted messages found in this channel.")
+    # Returns the name of the rule the message breaks, or None
+    def check_message(self, message, settings, now):
+        rule = self.get_matcher(message.guild).match(message.content)
+        if rule:
+            return rule
+        
+        mention_count = len(message.raw_mentions) + len(message.raw_role_mentions) + (1 if message.mention_everyone else 0)
+        if mention_count > settings["automod_max_mentions"]:
+            return "mentions"
+        
+        key = (message.guild.id, message.author.id)
+        
+        # Flood: the window holds the last N message times, full and younger than the limit means too fast
+        times = self.get_window(self.recent_messages, key, max(settings["automod_flood_messages"], 1))
+        times.append(now)
+        if len(times) == times.maxlen and now - times[0] <= settings["automod_flood_seconds"]:
+            times.clear()
+            return "flood"
+        
+        # Duplicates: the last N messages all have the same content within the limit
+        if message.content:
+            contents = self.get_window(self.recent_contents, key, max(settings["automod_duplicate_messages"], 1))
+            content_hash = hash(message.content.lower())
+            contents.append((now, content_hash))
+            if (len(contents) == contents.maxlen
+                    and now - contents[0][0] <= settings["automod_duplicate_seconds"]
+                    and all(h == content_hash for _, h in contents)):
+                contents.clear()
+                return "duplicate"
+        
+        return None
     
-    # Validate the num_back parameter
-    if num_back < 1:
-        return await ctx.send("Please provide a positive number.")
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if not message.guild or message.author.bot:
+            return
+        
+        settings = guild_settings(message.guild)
+        if not settings["automod_enabled"]:
+            return
+        
+        # Staff are never screened
+        if isinstance(message.author, discord.Member) and message.author.guild_permissions.administrator:
+            return
+        
+        rule = self.check_message(message, settings, time.monotonic())
+        if rule:
+            await self.take_action(message, rule, settings)
     
-    if num_back > len(self.deleted_messages[channel_id]):
-        return await ctx.send(f"Only {len(self.deleted_messages[channel_id])} deleted messages are stored for this channel.")
+    async def take_action(self, message, rule, settings):
+        member = message.author
+        reason = f"AutoMod: {rule}"
+        action = settings["automod_action"].lower()
+        
+        try:
+            await message.delete()
+        except discord.NotFound:
+            pass
+        except discord.HTTPException as e:
+            log.warning("AutoMod cannot delete message", extra={"guild_id": message.guild.id, "channel_id": message.channel.id, "error": str(e)})
+        
+        try:
+            if action == "timeout":
+                duration = parse_duration(settings["automod_timeout"]) or 600
+                native_duration, renew_in = split_timeout(duration)
+                await member.timeout(timedelta(seconds=native_duration), reason=reason)
+                punishment_scheduler.schedule(message.guild.id, member.id, "timeout", duration, run_in=renew_in, reason=reason)
+            elif action == "ban":
+                await member.ban(reason=reason)
+                staff_commands = self.bot.get_cog("StaffCommands")
+                if staff_commands:
+                    staff_commands.log_ban(member, self.bot.user, reason)
+        except discord.HTTPException as e:
+            log.warning("AutoMod action failed", extra={"guild_id": message.guild.id, "user_id": member.id, "action": action, "error": str(e)})
+        
+        log.info("AutoMod action", extra={"guild_id": message.guild.id, "user_id": member.id, "rule": rule, "action": action})
+        
+        log_channel = self.bot.get_channel(settings["mod_log_channel_id"] or 0)
+        if log_channel and log_channel.guild.id == message.guild.id:
+            embed = Embed(
+                title="AutoMod Action",
+                description=f"Message from {member.mention} in {message.channel.mention} was removed.",
+                color=0xFFA500,
+                timestamp=datetime.utcnow()
+            )
+            
+            embed.set_author(name=settings["author_name"], icon_url=self.bot.user.avatar.url if self.bot.user.avatar else None)
+            embed.add_field(name="User", value=f"{member.name} ({member.id})", inline=True)
+            embed.add_field(name="Rule", value=rule, inline=True)
+            embed.add_field(name="Action", value=action, inline=True)
+            embed.add_field(name="Content", value=message.content[:1024] or "*No content*", inline=False)
+            embed.set_footer(text=settings["footer"])
+            
+            await log_channel.send(embed=embed)
     
-    # Get the requested deleted message
-    msg_data = self.deleted_messages[channel_id][num_back - 1]
+    @commands.command(name="automod")
+    async def automod(self, ctx, rule_list: str, action="list", *, value=None):
+        if not ctx.guild:
+            return await ctx.send("This command can only be used in a server.")
+        
+        key = {"words": "automod_words", "regexes": "automod_regexes"}.get(rule_list.lower())
+        if key is None:
+            return await ctx.send("Invalid list. Please use 'words' or 'regexes'.")
+        
+        entries = list(guild_settings(ctx.guild)[key])
+        action = action.lower()
+        
+        if action == "list":
+            listing = "\n".join(f"`{entry}`" for entry in entries)
+            return await ctx.send(listing[:2000] if listing else "The list is empty.")
+        
+        if not value:
+            return await ctx.send("Please provide a value.")
+        
+        if action == "add":
+            if key == "automod_regexes":
+                if not is_valid_automod_regex(value):
+                    return await ctx.send("Invalid regex. Capturing groups (use (?:...) instead), numbered backreferences, inline flags like (?i) and patterns that can match empty text are not supported.")
+                if len(entries) >= AUTOMOD_MAX_REGEXES:
+                    return await ctx.send(f"A server can have at most {AUTOMOD_MAX_REGEXES} automod regexes, remove one first.")
+            if value in entries:
+                return await ctx.send("That entry is already in the list.")
+            entries.append(value)
+        elif action == "remove":
+            if value not in entries:
+                return await ctx.send("That entry is not in the list.")
+            entries.remove(value)
+        else:
+            return await ctx.send("Invalid action. Please use 'add', 'remove' or 'list'.")
+        
+        try:
+            guild_config.set(ctx.guild.id, key, entries)
+        except OSError as e:
+            return await ctx.send(f"An error occurred while saving the settings: {e}")
+        
+        await ctx.send(f"AutoMod {rule_list.lower()} updated ({len(entries)} entries).")
+# Upper bounds (in days) of the account age histogram buckets, the last bucket is everything older
+ACCOUNT_AGE_BUCKETS = (1, 7, 30, 365)
+# Most joins remembered from before a raid is detected, these become the first suspects
+RAID_RECENT_JOINS = 200
+# Most accounts queued for the bulk action during one raid
+RAID_MAX_SUSPECTS = 1000
+
+# Join counts for the last `window` seconds, kept in a ring of one-second slots so memory stays constant
+class JoinRateWindow:
+    def __init__(self, window, young_days):
+        self.window = max(int(window), 1)
+        self.young_days = young_days
+        # Each slot holds the histogram buckets followed by the young account count
+        self.slots = [[0] * (len(ACCOUNT_AGE_BUCKETS) + 2) for _ in range(self.window)]
+        self.totals = [0] * (len(ACCOUNT_AGE_BUCKETS) + 2)
+        self.last_second = None
     
-    # Create embed
-    embed = Embed(
-        title="Deleted Message",
-        description=msg_data["content"] or "*No content*",
-        color=0xFF5555,
-        timestamp=msg_data["timestamp"]
-    )
+    # Clear the slots of the seconds that fell out of the window since the last call
+    def advance(self, second):
+        if self.last_second is None:
+            self.last_second = second
+            return
+        
+        for stale in range(max(self.last_second + 1, second - self.window + 1), second + 1):
+            slot = self.slots[stale % self.window]
+            for i, count in enumerate(slot):
+                self.totals[i] -= count
+                slot[i] = 0
+        
+        self.last_second = max(self.last_second, second)
     
-    embed.set_author(
-        name=f"{msg_data['author'].name}#{msg_data['author'].discriminator}",
-        icon_url=msg_data['author'].avatar.url if msg_data['author'].avatar else msg_data['author'].default_avatar.url
-    )
+    def record(self, now, account_age_days):
+        second = int(now)
+        self.advance(second)
+        
+        slot = self.slots[second % self.window]
+        bucket = bisect_right(ACCOUNT_AGE_BUCKETS, account_age_days)
+        slot[bucket] += 1
+        self.totals[bucket] += 1
+        
+        if account_age_days < self.young_days:
+            slot[-1] += 1
+            self.totals[-1] += 1
     
-    # Add attachments if any
-    if msg_data["attachments"]:
-        embed.add_field(
-            name="Attachments",
-            value="\n".join(msg_data["attachments"]),
-            inline=False
-        )
+    @property
+    def joins(self):
+        return sum(self.totals[:-1])
     
-    # Add footer
-    embed.set_footer(text=f"Deleted message {num_back}/{len(self.deleted_messages[channel_id])}")
+    @property
+    def young_joins(self):
+        return self.totals[-1]
     
-    await ctx.send(embed=embed)
+    @property
+    def histogram(self):
+        return self.totals[:-1]
+
+# Per-guild raid state
+class RaidState:
+    def __init__(self):
+        self.active = False
+        self.started_at = None
+        self.locked_channel_ids = []
+        self.last_busy = None  # last time the join rate was above a threshold
+        # Set when only the young account threshold tripped, established accounts are then not suspects
+        self.young_only = False
+        self.suspects = OrderedDict()  # {member_id: member}
+        self.recent_joins = deque(maxlen=RAID_RECENT_JOINS)  # (time, member, account age in days)
 
-@commands.command(name="esnipe")
-async def esnipe(self, ctx, num_back: int = 1):
-    """Show the most recently edited message in the channel"""
-    channel_id = ctx.channel.id
+# Watches join rates and puts a guild into raid mode when they spike
+class RaidGuard:
+    def __init__(self):
+        self.windows = {}  # {guild_id: JoinRateWindow}
+        self.states = {}   # {guild_id: RaidState}
     
-    # Check if there are edited messages in this channel
-    if channel_id not in self.edited_messages or not self.edited_messages[channel_id]:
-        return await ctx.send("No recently edited messages found in this channel.")
+    def is_active(self, guild_id):
+        state = self.states.get(guild_id)
+        return bool(state and state.active)
     
-    # Validate the num_back parameter
-    if num_back < 1:
-        return await ctx.send("Please provide a positive number.")
+    def get_window(self, guild_id, settings):
+        window = self.windows.get(guild_id)
+        if (window is None or window.window != max(int(settings["raid_window_seconds"]), 1)
+                or window.young_days != settings["raid_young_account_days"]):
+            window = JoinRateWindow(settings["raid_window_seconds"], settings["raid_young_account_days"])
+            self.windows[guild_id] = window
+        return window
     
-    if num_back > len(self.edited_messages[channel_id]):
-        return await ctx.send(f"Only {len(self.edited_messages[channel_id])} edited messages are stored for this channel.")
+    # Record a join, returns True when this join put the guild into raid mode
+    def record_join(self, guild_id, settings, now, account_age_days, member=None):
+        window = self.get_window(guild_id, settings)
+        window.record(now, account_age_days)
+        
+        state = self.states.setdefault(guild_id, RaidState())
+        young = account_age_days < window.young_days
+        
+        too_many_joins = window.joins >= settings["raid_join_threshold"]
+        too_many_young = settings["raid_young_threshold"] > 0 and window.young_joins >= settings["raid_young_threshold"]
+        
+        if state.active:
+            if too_many_joins or too_many_young:
+                state.last_busy = now
+            if member is not None and (young or not state.young_only) and len(state.suspects) < RAID_MAX_SUSPECTS:
+                state.suspects[member.id] = member
+            return False
+        
+        if member is not None:
+            state.recent_joins.append((now, member, account_age_days))
+        
+        if not (too_many_joins or too_many_young):
+            return False
+        
+        state.active = True
+        state.started_at = datetime.utcnow()
+        state.last_busy = now
+        state.young_only = not too_many_joins
+        state.suspects = OrderedDict(
+            (joined.id, joined) for joined_at, joined, age_days in state.recent_joins
+            if now - joined_at <= window.window and (age_days < window.young_days or not state.young_only)
+        )
+        state.recent_joins.clear()
+        return True
     
-    # Get the requested edited message
-    edit_data = self.edited_messages[channel_id][num_back - 1]
+    # Guilds whose raid mode has been quiet for long enough to end
+    def quiet_guilds(self, now, settings_for=guild_config.get):
+        return [
+            guild_id for guild_id, state in self.states.items()
+            if state.active and now - state.last_busy >= settings_for(guild_id)["raid_quiet_seconds"]
+        ]
     
-    # Create embed
-    embed = Embed(
-        title="Edited Message",
-        color=0x5865F2,
-        timestamp=edit_data["after"]["timestamp"]
-    )
+    async def handle_join(self, member):
+        settings = guild_settings(member.guild)
+        
+        # Without a mod log channel nobody would hear about a raid, so detection stays off
+        if not settings["mod_log_channel_id"]:
+            return
+        
+        account_age_days = (discord.utils.utcnow() - member.created_at).total_seconds() / 86400
+        
+        if self.record_join(member.guild.id, settings, time.monotonic(), account_age_days, member):
+            await self.start_raid(member.guild, settings)
     
-    embed.set_author(
-        name=f"{edit_data['author'].name}#{edit_data['author'].discriminator}",
-        icon_url=edit_data['author'].avatar.url if edit_data['author'].avatar else edit_data['author'].default_avatar.url
-    )
+    async def start_raid(self, guild, settings):
+        state = self.states[guild.id]
+        window = self.windows[guild.id]
+        log.warning("Raid detected", extra={"guild_id": guild.id, "joins": window.joins, "young_joins": window.young_joins})
+        
+        channels = [guild.get_channel(channel_id) for channel_id in settings["raid_lock_channel_ids"]]
+        result = await lockdown_manager.lock(guild, [channel for channel in channels if channel])
+        state.locked_channel_ids = [channel.id for channel in result.changed]
+        
+        log_channel = bot.get_channel(settings["mod_log_channel_id"] or 0)
+        if log_channel and log_channel.guild.id == guild.id:
+            await log_channel.send(embed=self.create_status_embed(guild), view=RaidActionView(guild.id))
     
-    embed.add_field(
-        name="Before",
-        value=edit_data["before"]["content"] or "*No content*",
-        inline=False
-    )
+    async def end_raid(self, guild):
+        state = self.states.get(guild.id)
+        if not state:
+            return
+        
+        # Only reopen what the raid itself locked, anything locked by staff stays as it is
+        channels = [guild.get_channel(channel_id) for channel_id in state.locked_channel_ids]
+        await lockdown_manager.unlock(guild, [channel for channel in channels if channel])
+        
+        log.info("Raid mode ended", extra={"guild_id": guild.id, "suspects": len(state.suspects)})
+        self.states[guild.id] = RaidState()
     
-    embed.add_field(
-        name="After",
-        value=edit_data["after"]["content"] or "*No content*",
-        inline=False
-    )
+    # Take the queued suspects, so a second click can't act on them again
+    def pop_suspects(self, guild_id):
+        state = self.states.get(guild_id)
+        if not state:
+            return []
+        suspects = list(state.suspects.values())
+        state.suspects.clear()
+        return suspects
     
-    # Add link to the message
-    embed.add_field(
-        name="Jump to Message",
-        value=f"[Click here]({edit_data['url']})",
-        inline=False
-    )
+    def create_status_embed(self, guild):
+        settings = guild_settings(guild)
+        state = self.states.get(guild.id) or RaidState()
+        window = self.get_window(guild.id, settings)
+        window.advance(int(time.monotonic()))
+        
+        embed = Embed(
+            title="Raid Detected" if state.active else "Raid Status",
+            description="Raid mode is active. Welcome messages are paused." if state.active else "No raid in progress.",
+            color=0xFF0000 if state.active else 0x2F3136,
+            timestamp=datetime.utcnow()
+        )
+        
+        embed.set_author(name=settings["author_name"], icon_url=bot.user.avatar.url if bot.user.avatar else None)
+        embed.add_field(name="Joins", value=f"{window.joins} in the last {window.window}s", inline=True)
+        embed.add_field(name="Young Accounts", value=f"{window.young_joins} under {window.young_days} days old", inline=True)
+        
+        labels = [f"< {days}d" for days in ACCOUNT_AGE_BUCKETS] + [f"≥ {ACCOUNT_AGE_BUCKETS[-1]}d"]
+        embed.add_field(
+            name="Account Age",
+            value="\n".join(f"{label}: {count}" for label, count in zip(labels, window.histogram)),
+            inline=False
+        )
+        
+        if not settings["mod_log_channel_id"]:
+            embed.add_field(name="Detection Off", value=f"Set a mod log channel with `{settings['prefix']}config set mod_log_channel_id <channelID>` to turn on raid detection.", inline=False)
+        
+        if state.active:
+            embed.add_field(name="Suspects Queued", value=f"{len(state.suspects)}", inline=True)
+            embed.add_field(name="Channels Locked", value=f"{len(state.locked_channel_ids)}", inline=True)
+        
+        embed.set_footer(text=settings["footer"])
+        
+        return embed
+
+raid_guard = RaidGuard()
+
+# Buttons posted with a raid alert
+class RaidActionView(View):
+    def __init__(self, guild_id):
+        super().__init__(timeout=None)
+        self.guild_id = guild_id
+    
+    async def interaction_check(self, interaction):
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message("You don't have permission to use this.", ephemeral=True)
+            return False
+        return True
+    
+    @discord.ui.button(label="Ban Suspects", style=ButtonStyle.danger)
+    async def ban_suspects(self, interaction, button):
+        await interaction.response.defer(thinking=True)
+        
+        suspects = raid_guard.pop_suspects(self.guild_id)
+        reason = f"Raid cleanup by {interaction.user.name}"
+        banned = []
+        
+        # Bulk ban takes at most 200 users per request
+        for i in range(0, len(suspects), 200):
+            chunk = suspects[i:i + 200]
+            try:
+                result = await interaction.guild.bulk_ban(chunk, reason=reason)
+            except discord.HTTPException as e:
+                log.warning("Raid bulk ban failed", extra={"guild_id": self.guild_id, "error": str(e)})
+                continue
+            banned_ids = {user.id for user in result.banned}
+            banned.extend(member for member in chunk if member.id in banned_ids)
+        
+        staff_commands = bot.get_cog("StaffCommands")
+        if staff_commands:
+            for member in banned:
+                staff_commands.log_ban(member, interaction.user, reason)
+        
+        await interaction.followup.send(f"Banned {len(banned)} of {len(suspects)} suspected accounts.")
     
-    # Add footer
-    embed.set_footer(text=f"Edited message {num_back}/{len(self.edited_messages[channel_id])}")
+    @discord.ui.button(label="Kick Suspects", style=ButtonStyle.secondary)
+    async def kick_suspects(self, interaction, button):
+        await interaction.response.defer(thinking=True)
+        
+        suspects = raid_guard.pop_suspects(self.guild_id)
+        reason = f"Raid cleanup by {interaction.user.name}"
+        results = await asyncio.gather(*(member.kick(reason=reason) for member in suspects), return_exceptions=True)
+        kicked = sum(1 for result in results if not isinstance(result, Exception))
+        
+        await interaction.followup.send(f"Kicked {kicked} of {len(suspects)} suspected accounts.")
     
-    await ctx.send(embed=embed)
+    @discord.ui.button(label="End Raid Mode", style=ButtonStyle.success)
+    async def end_raid_mode(self, interaction, button):
+        await interaction.response.defer(thinking=True)
+        await raid_guard.end_raid(interaction.guild)
+        await interaction.followup.send("Raid mode ended. Welcome messages resumed and locked channels were reopened.")
 
-    # ^ Misc Cog End
 async def setup():
     await bot.add_cog(StaffCommands(bot))
     await bot.add_cog(MemberCommands(bot))
     await bot.add_cog(Misc(bot))
+    await bot.add_cog(AutoMod(bot))
 
 @bot.event
 async def on_ready():
     await setup()
-    print(f'Bot is logged in as {bot.user}')
+    log.info("Bot is logged in as %s", bot.user)
+    await sync_command_tree()
     
+    loop_lag_monitor.start()
     check_github_updates.start()
+    if not reload_guild_config.is_running():
+        reload_guild_config.start()
+    punishment_scheduler.start()
+    if not end_quiet_raids.is_running():
+        end_quiet_raids.start()
+    if not snapshot_member_analytics.is_running():
+        snapshot_member_analytics.start()
+    if ARCHIVE_MODE != "off":
+        message_archive.start()
 
 TOKEN = 'nice try'
-bot.run(TOKEN)
+
+if __name__ == "__main__":
+    # Logging is already set up above, keep discord.py from adding its own handler
+    bot.run(TOKEN, log_handler=None)
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# bot.py keeps its state files in SERVERBOT_DATA_DIR, point it somewhere disposable before it is imported
+os.environ.setdefault("SERVERBOT_DATA_DIR", tempfile.mkdtemp(prefix="serverbot-tests-"))
+os.environ.setdefault("SERVERBOT_LOG_LEVEL", "WARNING")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
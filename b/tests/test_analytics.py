@@ -0,0 +1,66 @@
+import tempfile
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import numpy as np
+
+from bot import MemberAnalytics, MemberSnapshot, cohort_retention, member_churn
+
+DAY = 86400
+NOW = 1_700_000_000.0
+
+
+def make_member(member_id, joined_days_ago, created_days_ago, roles=(), bot=False):
+    return SimpleNamespace(
+        id=member_id,
+        joined_at=datetime.fromtimestamp(NOW - joined_days_ago * DAY, timezone.utc) if joined_days_ago is not None else None,
+        created_at=datetime.fromtimestamp(NOW - created_days_ago * DAY, timezone.utc),
+        bot=bot,
+        _roles=list(roles),
+    )
+
+
+def make_snapshot(members, taken_at=NOW):
+    return MemberSnapshot.from_members(1, members, taken_at)
+
+
+def test_columns_and_csr_roles():
+    snapshot = make_snapshot([
+        make_member(10, 1, 0.5, roles=(7, 8)),
+        make_member(11, None, 3),
+        make_member(12, 20, 400, roles=(8,), bot=True),
+    ])
+    assert snapshot.ids.tolist() == [10, 11, 12]
+    assert np.isnan(snapshot.joined_at[1])
+    assert snapshot.bots.tolist() == [False, False, True]
+    assert snapshot.role_offsets.tolist() == [0, 2, 2, 3]
+    assert snapshot.role_ids[snapshot.role_offsets[0]:snapshot.role_offsets[1]].tolist() == [7, 8]
+    assert snapshot.role_histogram() == {8: 2, 7: 1}
+    assert snapshot.account_age_histogram() == [1, 1, 0, 0, 1]
+
+
+def test_churn_and_cohort_retention():
+    first = make_snapshot([make_member(i, i, 100) for i in range(1, 21)])
+    # Members 1-5 left, 100-102 joined
+    later = make_snapshot([make_member(i, i, 100) for i in range(6, 21)] + [make_member(i, 0, 1) for i in (100, 101, 102)], NOW + DAY)
+    assert member_churn(first.ids, later.ids) == (3, 5)
+
+    sizes, kept = cohort_retention(first, later, period=7 * DAY, cohorts=3)
+    # Joined 1-6 days before the first snapshot, 7-13 and 14-20
+    assert sizes.tolist() == [6, 7, 7]
+    assert kept.tolist() == [1, 7, 7]
+
+
+def test_report_uses_snapshots_in_range_and_prunes():
+    analytics = MemberAnalytics(tempfile.mkdtemp(), max_snapshots=3)
+    members = [make_member(i, 10, 100, roles=(5,)) for i in range(10)]
+    for day in range(4):
+        analytics.record(make_snapshot(members[:10 - day], NOW + day * DAY))
+
+    assert len(analytics.snapshot_paths(1)) == 3
+    report = analytics.report(1, days=1, now=NOW + 3 * DAY)
+    assert report["snapshots"] == 2
+    assert report["members"] == 7
+    assert (report["growth"], report["joined"], report["left"]) == (-1, 0, 1)
+    assert report["roles"] == {5: 7}
+    assert analytics.report(2, days=2, now=NOW) is None
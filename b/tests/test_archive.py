@@ -0,0 +1,70 @@
+import tempfile
+import time
+
+from bot import MessageArchive
+
+
+def make_archive(directory=None, **kwargs):
+    kwargs.setdefault("segment_bytes", 4096)
+    kwargs.setdefault("batch_records", 50)
+    kwargs.setdefault("flush_seconds", 0.05)
+    return MessageArchive(directory or tempfile.mkdtemp(), **kwargs)
+
+
+def fill(archive, count, start=0):
+    for i in range(start, start + count):
+        archive.append({"ts": 1000.0 + i, "type": "delete", "guild_id": 1, "channel_id": i % 3, "content": f"message {i}"})
+
+
+def test_read_range_returns_only_requested_records():
+    archive = make_archive()
+    archive.start()
+    fill(archive, 1000)
+    archive.stop()
+
+    records = archive.read_range(1100, 1199)
+    assert [record["content"] for record in records] == [f"message {i}" for i in range(100, 200)]
+
+    records = archive.read_range(1100, 1199, channel_id=1)
+    assert all(record["channel_id"] == 1 for record in records)
+    assert len(records) == 34
+
+
+def test_segments_rotate_and_blocks_are_compressed():
+    archive = make_archive()
+    archive.start()
+    fill(archive, 2000)
+    archive.stop()
+
+    assert len(archive.segment_paths()) > 1
+    assert archive.stats["records"] == 2000
+    assert archive.stats["written_bytes"] < archive.stats["raw_bytes"]
+
+
+def test_archive_continues_after_restart():
+    directory = tempfile.mkdtemp()
+
+    archive = make_archive(directory)
+    archive.start()
+    fill(archive, 300)
+    archive.stop()
+
+    restarted = make_archive(directory)
+    restarted.start()
+    fill(restarted, 300, start=300)
+    restarted.stop()
+
+    assert len(restarted.read_range(0, 10 ** 9)) == 600
+
+
+def test_partial_batch_is_flushed_after_timeout():
+    archive = make_archive(batch_records=10000, flush_seconds=0.01)
+    archive.start()
+    fill(archive, 5)
+
+    deadline = time.monotonic() + 2
+    while archive.stats["records"] < 5 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    archive.stop()
+
+    assert len(archive.read_range(0, 10 ** 9)) == 5
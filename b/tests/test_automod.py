@@ -0,0 +1,52 @@
+import pytest
+
+from bot import AUTOMOD_MAX_REGEXES, DEFAULT_GUILD_CONFIG, AutoModMatcher, is_valid_automod_regex
+
+
+def make_matcher(**settings):
+    return AutoModMatcher(dict(DEFAULT_GUILD_CONFIG, **settings))
+
+
+@pytest.mark.parametrize("pattern", [r"fr[e3]{2}\s+nitro", r"(?:buy|sell)\s+accounts", r"\bspam\b", r"(?<=@)everyone"])
+def test_valid_regexes(pattern):
+    assert is_valid_automod_regex(pattern)
+
+
+@pytest.mark.parametrize("pattern", [
+    "x)|(y",         # closes the group it is embedded in
+    "(y)",           # capturing group
+    "(?P<word>y)",   # named group
+    r"(a)\1",        # numbered backreference
+    "(?i)y",         # global flag not at the start once embedded
+    "a*",            # matches empty text
+    r"\s*",
+    r"\b",
+    "[",
+])
+def test_invalid_regexes(pattern):
+    assert not is_valid_automod_regex(pattern)
+
+
+def test_match_reports_the_rule():
+    matcher = make_matcher(automod_words=["badword", "two words"], automod_regexes=[r"fr[e3]{2}\s+nitro"])
+    assert matcher.match("this has a BadWord in it") == "word"
+    assert matcher.match("say two words here") == "word"
+    assert matcher.match("get FR33  nitro now") == "regex"
+    assert matcher.match("join discord.gg/abc") == "invite"
+    assert matcher.match("hello there") is None
+    assert matcher.match("") is None
+
+
+def test_invalid_stored_regexes_are_skipped():
+    # As if the config file was edited by hand
+    matcher = make_matcher(automod_regexes=["x)|(y", "a*", "spam+"])
+    assert matcher.match("y") is None
+    assert matcher.match("hello") is None
+    assert matcher.match("spammm") == "regex"
+
+
+def test_only_the_first_regexes_are_used():
+    regexes = [f"rule{i}x" for i in range(AUTOMOD_MAX_REGEXES + 5)]
+    matcher = make_matcher(automod_regexes=regexes)
+    assert matcher.match(f"rule{AUTOMOD_MAX_REGEXES - 1}x") == "regex"
+    assert matcher.match(f"rule{AUTOMOD_MAX_REGEXES}x") is None
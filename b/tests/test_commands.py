@@ -0,0 +1,96 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import discord
+
+import bot as serverbot
+
+
+def test_cogs_are_hybrid_and_staff_commands_are_admin_only():
+    staff = serverbot.StaffCommands(serverbot.bot)
+    for command in staff.get_commands():
+        assert command.app_command.default_permissions == discord.Permissions(administrator=True)
+        assert command.app_command.guild_only
+
+    for cog in (serverbot.MemberCommands(serverbot.bot), serverbot.Misc(serverbot.bot)):
+        for command in cog.get_commands():
+            assert command.app_command.default_permissions is None
+
+
+def test_tree_syncs_only_when_it_changes(monkeypatch):
+    calls = []
+
+    async def fake_sync():
+        calls.append(1)
+        return serverbot.bot.tree.get_commands()
+
+    monkeypatch.setattr(serverbot.bot.tree, "sync", fake_sync)
+    if os.path.exists(serverbot.COMMAND_TREE_HASH_FILE):
+        os.remove(serverbot.COMMAND_TREE_HASH_FILE)
+
+    async def scenario():
+        if serverbot.bot.get_cog("StaffCommands") is None:
+            await serverbot.setup()
+        first = await serverbot.sync_command_tree()
+        second = await serverbot.sync_command_tree()
+        serverbot.bot.tree.remove_command("links")
+        third = await serverbot.sync_command_tree()
+        return first, second, third
+
+    assert asyncio.run(scenario()) == (True, False, True)
+    assert len(calls) == 2
+    assert {"sys", "serverinfo", "stats", "search"} <= {command.name for command in serverbot.bot.tree.get_commands()}
+
+
+def test_command_timings_record_ack_and_result():
+    timings = serverbot.CommandTimings()
+    ctx = SimpleNamespace(command=SimpleNamespace(qualified_name="sys"), interaction=None)
+
+    timings.start(ctx)
+    timings.acknowledge(ctx)
+    acknowledged = ctx.timing_acknowledged
+    timings.acknowledge(ctx)
+    assert ctx.timing_acknowledged == acknowledged
+    timings.finish(ctx)
+
+    count, ack_total, ack_max, result_total, result_max = timings.timings["sys"]
+    assert count == 1
+    assert 0 <= ack_total <= result_total
+
+    # Without a defer the result is also the ack
+    timings.start(ctx)
+    timings.finish(ctx)
+    count, ack_total, ack_max, result_total, result_max = timings.timings["sys"]
+    assert count == 2
+    assert ack_max <= result_max
+
+
+def test_guild_commands_are_not_offered_in_dms():
+    member_commands = serverbot.MemberCommands(serverbot.bot)
+    misc = serverbot.Misc(serverbot.bot)
+    for command in (member_commands.membercount, misc.serverinfo, misc.stats):
+        assert command.app_command.guild_only
+    for command in (member_commands.avatar, member_commands.links):
+        assert not command.app_command.guild_only
+
+
+def test_slash_sys_does_not_need_the_flag(monkeypatch):
+    staff = serverbot.StaffCommands(serverbot.bot)
+    sent = []
+
+    async def send(content=None, **kwargs):
+        sent.append(content)
+
+    async def fail(*args, **kwargs):
+        raise RuntimeError("probing")
+
+    # Stop right after the flag check, the probe is covered elsewhere
+    monkeypatch.setattr(serverbot, "acknowledge", fail)
+    prefix_ctx = SimpleNamespace(interaction=None, guild=None, send=send)
+    slash_ctx = SimpleNamespace(interaction=object(), guild=None, send=send)
+
+    asyncio.run(staff.system_info.callback(staff, prefix_ctx))
+    assert "sys --b" in sent.pop()
+    asyncio.run(staff.system_info.callback(staff, slash_ctx))
+    assert sent.pop() == "An error occurred while fetching system information: probing"
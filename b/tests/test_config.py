@@ -0,0 +1,93 @@
+import json
+import os
+import tempfile
+
+import pytest
+
+from bot import DEFAULT_GUILD_CONFIG, GuildConfigStore, parse_setting
+
+
+def write(path, data, mtime):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.utime(path, (mtime, mtime))
+
+
+def make_store(data=None):
+    path = os.path.join(tempfile.mkdtemp(), "guild_config.json")
+    if data is not None:
+        write(path, data, 1000)
+    return GuildConfigStore(path), path
+
+
+def test_load_merges_defaults_and_ignores_unknown_settings():
+    store, _ = make_store({"1": {"prefix": "!", "raid_join_threshold": 20, "old_setting": 1}})
+    settings = store.get(1)
+    assert settings["prefix"] == "!"
+    assert settings["raid_join_threshold"] == 20
+    assert settings["footer"] == DEFAULT_GUILD_CONFIG["footer"]
+    assert "old_setting" not in settings
+    assert store.get(2) is DEFAULT_GUILD_CONFIG
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    {"my-guild": {"prefix": "!"}},
+    {"1": "!"},
+    {"1": {"prefix": 5}},
+    {"1": {"automod_action": "explode"}},
+    {"1": {"raid_window_seconds": 0}},
+    {"1": {"automod_enabled": "yes"}},
+    {"1": {"automod_timeout": "soon"}},
+    {"1": {"raid_lock_channel_ids": ["123"]}},
+])
+def test_badly_shaped_file_keeps_previous_settings(data):
+    store, path = make_store({"1": {"prefix": "!"}})
+    write(path, data, 2000)
+
+    assert store.reload_if_changed() is False
+    assert store.get(1)["prefix"] == "!"
+    # Reported once, not again on the next check
+    assert store.reload_if_changed() is False
+
+
+def test_reload_only_when_mtime_changes():
+    store, path = make_store({"1": {"prefix": "!"}})
+    version = store.version
+    assert store.reload_if_changed() is False
+
+    write(path, {"1": {"prefix": "?"}}, 2000)
+    assert store.reload_if_changed() is True
+    assert store.get(1)["prefix"] == "?"
+    assert store.version == version + 1
+
+
+def test_set_saves_only_overrides():
+    store, path = make_store()
+    store.set(1, "prefix", "!")
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"1": {"prefix": "!"}}
+
+    assert GuildConfigStore(path).get(1)["prefix"] == "!"
+
+
+def test_parse_setting():
+    assert parse_setting("mod_log_channel_id", "<#123>") == 123
+    assert parse_setting("mute_role_id", "none") is None
+    assert parse_setting("automod_enabled", "On") is True
+    assert parse_setting("automod_action", "BAN") == "ban"
+    assert parse_setting("automod_timeout", "5m") == "5m"
+    assert parse_setting("raid_young_threshold", "0") == 0
+
+    for key, text in [
+        ("unknown", "1"),
+        ("mod_log_channel_id", "general"),
+        ("raid_join_threshold", "ten"),
+        ("raid_join_threshold", "0"),
+        ("raid_window_seconds", "3601"),
+        ("automod_action", "kick"),
+        ("automod_timeout", "0s"),
+        ("automod_timeout", "99999d"),
+    ]:
+        with pytest.raises(ValueError):
+            parse_setting(key, text)
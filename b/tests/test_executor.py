@@ -0,0 +1,159 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import discord
+import pytest
+
+import bot
+from bot import BlockingWorkRunner, ExecutorBusy, LoopLagMonitor, collect_system_info
+
+
+def test_blocking_work_keeps_loop_responsive():
+    async def scenario():
+        runner = BlockingWorkRunner(threads=4)
+        monitor = LoopLagMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.05)
+        info, _ = await asyncio.gather(
+            runner.run(collect_system_info, _name="system_info"),
+            runner.run(time.sleep, 0.2, _name="sleep"),
+        )
+        monitor.task.cancel()
+        return info, monitor.max_lag, runner.timings
+
+    info, max_lag, timings = asyncio.run(scenario())
+    assert "Memory" in info["resources"]
+    assert max_lag < 0.02
+    assert timings["sleep"][0] == 1
+    assert timings["sleep"][2] >= 0.2
+
+
+def test_keyword_arguments_reach_the_function():
+    def echo(timeout=None, name=None):
+        return timeout, name
+
+    async def scenario():
+        runner = BlockingWorkRunner(threads=1)
+        return await runner.run(echo, timeout=10, name="x", _name="echo")
+
+    assert asyncio.run(scenario()) == (10, "x")
+
+
+def test_timeout_and_pending_cap():
+    async def scenario():
+        runner = BlockingWorkRunner(threads=2, max_pending=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await runner.run(time.sleep, 0.3, _timeout=0.05)
+
+        # The timed out call still holds its thread, so it still counts
+        with pytest.raises(ExecutorBusy):
+            await runner.run(time.sleep, 0)
+        await asyncio.sleep(0.35)
+        assert runner.pending == 0
+
+        await runner.run(time.sleep, 0)
+        assert runner.timings["sleep"][0] == 2
+
+    asyncio.run(scenario())
+
+
+def test_cpu_work_runs_in_the_process_pool():
+    async def scenario():
+        runner = BlockingWorkRunner(threads=1, processes=1)
+        try:
+            return await runner.run(bot.os.getpid, _cpu=True), await runner.run(bot.os.getpid)
+        finally:
+            runner.processes.shutdown()
+
+    in_process, in_thread = asyncio.run(scenario())
+    assert in_thread == bot.os.getpid()
+    assert in_process != in_thread
+
+
+class FakeContext:
+    def __init__(self, guild, author):
+        self.guild = guild
+        self.author = author
+        self.interaction = None
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(content or kwargs.get("embed"))
+
+    async def typing(self):
+        pass
+
+
+class FakeResponse:
+    status_code = 200
+
+    def json(self):
+        return []
+
+
+def test_handlers_do_not_block_the_loop(monkeypatch):
+    """Drive the handlers that used to do blocking work inline and watch the loop while they run."""
+    now = datetime.now(timezone.utc)
+    members = [
+        SimpleNamespace(id=i, bot=i % 50 == 0, status=discord.Status.online if i % 3 else discord.Status.offline)
+        for i in range(300000)
+    ]
+    guild = SimpleNamespace(
+        id=1, name="Guild", description=None, icon=None, created_at=now, owner=SimpleNamespace(mention="@owner"),
+        verification_level="low", features=[], text_channels=[1, 2], voice_channels=[3], categories=[4],
+        roles=[0, 1], emojis=[], member_count=len(members), members=members,
+    )
+    moderator = SimpleNamespace(id=2, name="mod", mention="@mod")
+    target = SimpleNamespace(id=3, name="user", mention="@user", guild=guild)
+
+    async def timeout_member(until, reason=None):
+        await asyncio.sleep(0)
+
+    target.timeout = timeout_member
+
+    requested = []
+
+    def slow_get(url, headers=None, timeout=None):
+        requested.append(timeout)
+        time.sleep(0.1)
+        return FakeResponse()
+
+    async def ready():
+        pass
+
+    monkeypatch.setattr(bot, "blocking_work", BlockingWorkRunner(threads=4))
+    monkeypatch.setattr(bot.requests, "get", slow_get)
+    monkeypatch.setattr(bot.bot, "wait_until_ready", ready)
+    monkeypatch.setattr(bot.bot._connection, "user", SimpleNamespace(id=4, name="bot", avatar=None), raising=False)
+    monkeypatch.setattr(bot, "punishment_scheduler", bot.PunishmentScheduler(bot.os.path.join(bot.DATA_DIR, "lag-test.db")))
+
+    staff = bot.StaffCommands(bot.bot)
+    misc = bot.Misc(bot.bot)
+    staff.log_ban(target, moderator, "spam " * 2000)
+
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.005)
+        monitor.start()
+        await asyncio.sleep(0.02)
+
+        contexts = [FakeContext(guild, moderator) for _ in range(4)]
+        for ctx in contexts:
+            bot.command_timings.start(ctx)
+        await asyncio.gather(
+            misc.serverinfo.callback(misc, contexts[0]),
+            staff.logban.callback(staff, contexts[1], 1, "toJson", extra_note="note"),
+            staff.timeout.callback(staff, contexts[2], target, "40d", "toJson", reason="spam"),
+            bot.check_github_updates.coro(),
+        )
+
+        monitor.task.cancel()
+        return monitor.max_lag, contexts
+
+    max_lag, contexts = asyncio.run(scenario())
+    assert requested == [10]
+    assert "Bots: 6,000" in contexts[0].sent[0].fields[1].value
+    assert contexts[1].sent[0].startswith("```json")
+    assert contexts[2].sent[-1].startswith("```json")
+    assert max_lag < 0.02, f"event loop was blocked for {max_lag * 1000:.1f}ms"
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import tempfile
+from types import SimpleNamespace
+
+import discord
+
+from bot import LockdownManager
+
+class FakeRole:
+    id = 1
+    name = "@everyone"
+
+
+EVERYONE = FakeRole()
+
+
+class FakeChannel:
+    def __init__(self, channel_id, overwrite=None, fail=False):
+        self.id = channel_id
+        self.overwrites = {EVERYONE: overwrite} if overwrite is not None else {}
+        self.fail = fail
+        self.calls = 0
+
+    def overwrites_for(self, role):
+        overwrite = self.overwrites.get(role)
+        return discord.PermissionOverwrite(**dict(overwrite)) if overwrite else discord.PermissionOverwrite()
+
+    async def set_permissions(self, role, overwrite):
+        self.calls += 1
+        if self.fail:
+            raise discord.HTTPException(SimpleNamespace(status=403, reason="Forbidden"), "Missing Permissions")
+        if overwrite is None:
+            self.overwrites.pop(role, None)
+        else:
+            self.overwrites[role] = overwrite
+
+
+class FakeGuild:
+    id = 10
+    default_role = EVERYONE
+
+    def __init__(self, *channels):
+        self.channels = {channel.id: channel for channel in channels}
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+
+def make_manager():
+    return LockdownManager(os.path.join(tempfile.mkdtemp(), "lockdown_state.json"))
+
+
+def test_lock_snapshots_and_unlock_restores_exact_state():
+    custom = FakeChannel(100, discord.PermissionOverwrite(view_channel=True, attach_files=False))
+    plain = FakeChannel(101)
+    guild = FakeGuild(custom, plain)
+    manager = make_manager()
+
+    result = asyncio.run(manager.lock(guild, [custom, plain]))
+    assert len(result.changed) == 2
+    allow, deny = discord.PermissionOverwrite(view_channel=True, attach_files=False).pair()
+    assert manager.snapshots[guild.id] == {100: [allow.value, deny.value], 101: None}
+    assert custom.overwrites[EVERYONE].send_messages is False
+    assert custom.overwrites[EVERYONE].view_channel is True
+    assert plain.overwrites[EVERYONE].send_messages is False
+
+    result = asyncio.run(manager.unlock(guild))
+    assert len(result.changed) == 2
+    # Restored with from_pair, the lock's send_messages is gone again
+    assert custom.overwrites[EVERYONE].pair() == (allow, deny)
+    # There was no overwrite before, so it is deleted
+    assert EVERYONE not in plain.overwrites
+    assert manager.locked_channel_ids(guild.id) == []
+
+
+def test_locking_twice_keeps_the_first_snapshot():
+    channel = FakeChannel(100, discord.PermissionOverwrite(embed_links=False))
+    guild = FakeGuild(channel)
+    manager = make_manager()
+
+    asyncio.run(manager.lock(guild, [channel]))
+    first = manager.snapshots[guild.id][100]
+    result = asyncio.run(manager.lock(guild, [channel]))
+
+    assert result.skipped == [channel]
+    assert manager.snapshots[guild.id][100] == first
+    asyncio.run(manager.unlock(guild, [channel]))
+    assert channel.overwrites[EVERYONE].send_messages is None
+    assert channel.overwrites[EVERYONE].embed_links is False
+
+
+def test_failed_channels_drop_their_snapshot():
+    ok = FakeChannel(100)
+    broken = FakeChannel(101, fail=True)
+    manager = make_manager()
+
+    result = asyncio.run(manager.lock(FakeGuild(ok, broken), [ok, broken]))
+    assert [channel.id for channel, _ in result.failed] == [101]
+    assert manager.locked_channel_ids(FakeGuild.id) == [100]
+
+
+def test_server_unlock_forgets_deleted_channels():
+    kept = FakeChannel(100)
+    deleted = FakeChannel(101)
+    manager = make_manager()
+    asyncio.run(manager.lock(FakeGuild(kept, deleted), [kept, deleted]))
+
+    result = asyncio.run(manager.unlock(FakeGuild(kept)))
+    assert result.changed == [kept]
+    assert deleted.calls == 1
+    assert manager.locked_channel_ids(FakeGuild.id) == []
+
+
+def test_snapshot_survives_a_restart():
+    channel = FakeChannel(100, discord.PermissionOverwrite(add_reactions=False))
+    manager = make_manager()
+    asyncio.run(manager.lock(FakeGuild(channel), [channel]))
+
+    restarted = LockdownManager(manager.path)
+    assert restarted.snapshots == manager.snapshots
+
+    asyncio.run(restarted.unlock(FakeGuild(channel)))
+    assert channel.overwrites[EVERYONE].add_reactions is False
+    assert channel.overwrites[EVERYONE].send_messages is None
+    assert LockdownManager(manager.path).snapshots == {}
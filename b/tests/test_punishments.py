@@ -0,0 +1,100 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import bot
+from bot import MAX_DURATION, MAX_NATIVE_TIMEOUT, TIMEOUT_RENEW_MARGIN, PunishmentScheduler, parse_duration, split_timeout
+
+
+def make_scheduler():
+    return PunishmentScheduler(os.path.join(tempfile.mkdtemp(), "punishments.db"))
+
+
+def test_parse_duration():
+    assert parse_duration("30s") == 30
+    assert parse_duration("5m") == 300
+    assert parse_duration("2h") == 7200
+    assert parse_duration("1d") == 86400
+    assert parse_duration("45") == 45
+    assert parse_duration("soon") is None
+    assert parse_duration("") is None
+    assert parse_duration("99999999d") is None
+    assert parse_duration(f"{MAX_DURATION}") == MAX_DURATION
+
+
+def test_split_timeout_renews_before_discord_lifts_it():
+    assert split_timeout(3600) == (3600, None)
+    assert split_timeout(MAX_NATIVE_TIMEOUT) == (MAX_NATIVE_TIMEOUT, None)
+    assert split_timeout(60 * 86400) == (MAX_NATIVE_TIMEOUT, MAX_NATIVE_TIMEOUT - TIMEOUT_RENEW_MARGIN)
+
+
+def test_schedule_replaces_and_cancels():
+    scheduler = make_scheduler()
+
+    scheduler.schedule(1, 10, "ban", 100)
+    scheduler.schedule(1, 10, "ban", 200)
+    assert len(scheduler.for_guild(1)) == 1
+
+    assert scheduler.cancel(1, 10, "ban") is not None
+    assert scheduler.for_guild(1) == []
+    assert scheduler.cancel(1, 10, "ban") is None
+
+
+def test_heap_is_rebuilt_after_restart():
+    scheduler = make_scheduler()
+    for user_id in range(50):
+        scheduler.schedule(1, user_id, "mute", 1000 + user_id, role_id=5)
+    scheduler.cancel(1, 7, "mute")
+
+    restarted = PunishmentScheduler(scheduler.db.execute("PRAGMA database_list").fetchone()[2])
+
+    assert len(restarted.pending) == 49
+    assert restarted.heap[0][0] == min(p["next_run"] for p in restarted.pending.values())
+
+
+def test_expiries_fire_in_order():
+    async def run():
+        scheduler = make_scheduler()
+        fired = []
+
+        async def fire(punishment):
+            fired.append(punishment["user_id"])
+            scheduler.remove(punishment["id"])
+
+        scheduler.fire = fire
+        scheduler.start()
+
+        for user_id, duration in ((1, 0.3), (2, 0.1), (3, 0.2), (4, 0.25)):
+            scheduler.schedule(1, user_id, "ban", duration)
+        scheduler.cancel(1, 4, "ban")
+
+        await asyncio.sleep(0.5)
+        scheduler.task.cancel()
+        return fired
+
+    assert asyncio.run(run()) == [2, 3, 1]
+
+
+def test_timeout_removed_in_client_or_unban_cancels_entry(monkeypatch):
+    scheduler = make_scheduler()
+    monkeypatch.setattr(bot, "punishment_scheduler", scheduler)
+    scheduler.schedule(1, 10, "timeout", 60 * 86400)
+    scheduler.schedule(1, 10, "ban", 3600)
+
+    guild = SimpleNamespace(id=1)
+    until = datetime.now(timezone.utc) + timedelta(days=20)
+    timed_out = SimpleNamespace(id=10, guild=guild, timed_out_until=until, is_timed_out=lambda: True)
+    renewed = SimpleNamespace(id=10, guild=guild, timed_out_until=until + timedelta(days=1), is_timed_out=lambda: True)
+    cleared = SimpleNamespace(id=10, guild=guild, timed_out_until=None, is_timed_out=lambda: False)
+
+    # The bot renewing the timeout keeps the entry
+    asyncio.run(bot.on_member_update(timed_out, renewed))
+    assert {p["kind"] for p in scheduler.for_guild(1)} == {"timeout", "ban"}
+
+    asyncio.run(bot.on_member_update(timed_out, cleared))
+    assert {p["kind"] for p in scheduler.for_guild(1)} == {"ban"}
+
+    asyncio.run(bot.on_member_unban(guild, SimpleNamespace(id=10)))
+    assert scheduler.for_guild(1) == []
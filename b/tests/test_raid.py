@@ -0,0 +1,132 @@
+import bot
+from bot import ACCOUNT_AGE_BUCKETS, DEFAULT_GUILD_CONFIG, JoinRateWindow, RaidGuard
+
+
+class FakeMember:
+    def __init__(self, member_id):
+        self.id = member_id
+
+
+def make_settings(**overrides):
+    settings = dict(DEFAULT_GUILD_CONFIG)
+    settings.update(
+        raid_window_seconds=30,
+        raid_join_threshold=10,
+        raid_young_account_days=7,
+        raid_young_threshold=5,
+        raid_quiet_seconds=60,
+    )
+    settings.update(overrides)
+    return settings
+
+
+def test_window_counts_joins_inside_window():
+    window = JoinRateWindow(10, 7)
+    for i in range(20):
+        window.record(100 + i * 0.5, 400)
+
+    assert window.joins == 20
+    assert window.young_joins == 0
+
+
+def test_window_expires_old_joins():
+    window = JoinRateWindow(10, 7)
+    for i in range(10):
+        window.record(100 + i, 400)
+
+    window.record(115, 400)
+    # Only the joins from seconds 106-115 are still inside the window
+    assert window.joins == 5
+
+    window.record(500, 0.5)
+    assert window.joins == 1
+    assert window.young_joins == 1
+
+
+def test_window_histogram_buckets():
+    window = JoinRateWindow(60, 7)
+    ages = [0.5, 1, 3, 7, 20, 100, 364, 365, 1000]
+    for age in ages:
+        window.record(10, age)
+
+    assert len(window.histogram) == len(ACCOUNT_AGE_BUCKETS) + 1
+    assert window.histogram == [1, 2, 2, 2, 2]
+    assert window.young_joins == 3
+
+
+def test_slow_join_stream_never_trips():
+    guard = RaidGuard()
+    settings = make_settings()
+
+    tripped = [guard.record_join(1, settings, i * 10, 400, FakeMember(i)) for i in range(200)]
+
+    assert not any(tripped)
+    assert not guard.is_active(1)
+
+
+def test_join_threshold_trips_once_and_collects_suspects():
+    guard = RaidGuard()
+    settings = make_settings(raid_young_threshold=0)
+
+    tripped = [guard.record_join(1, settings, 1000 + i * 0.5, 400, FakeMember(i)) for i in range(15)]
+
+    assert tripped.index(True) == 9
+    assert tripped.count(True) == 1
+    assert guard.is_active(1)
+    assert list(guard.states[1].suspects) == list(range(15))
+
+
+def test_joins_before_window_are_not_suspects():
+    guard = RaidGuard()
+    settings = make_settings(raid_young_threshold=0)
+
+    guard.record_join(1, settings, 0, 400, FakeMember(999))
+    for i in range(10):
+        guard.record_join(1, settings, 1000 + i * 0.1, 400, FakeMember(i))
+
+    assert guard.is_active(1)
+    assert 999 not in guard.states[1].suspects
+
+
+def test_young_threshold_only_queues_young_accounts():
+    guard = RaidGuard()
+    settings = make_settings(raid_join_threshold=50)
+
+    for i in range(10):
+        age = 0.5 if i % 2 else 400
+        guard.record_join(1, settings, 1000 + i, age, FakeMember(i))
+
+    assert guard.is_active(1)
+    assert guard.states[1].young_only
+
+    guard.record_join(1, settings, 1011, 400, FakeMember(100))
+    guard.record_join(1, settings, 1012, 0.5, FakeMember(101))
+
+    assert set(guard.states[1].suspects) == {1, 3, 5, 7, 9, 101}
+
+
+def test_raid_ends_after_quiet_period():
+    guard = RaidGuard()
+    settings = make_settings(raid_young_threshold=0)
+
+    for i in range(10):
+        guard.record_join(1, settings, 1000 + i * 0.1, 400, FakeMember(i))
+
+    settings_for = lambda guild_id: settings
+    assert guard.quiet_guilds(1030, settings_for) == []
+    assert guard.quiet_guilds(1061, settings_for) == [1]
+
+
+def test_guilds_are_tracked_separately():
+    guard = RaidGuard()
+    settings = make_settings(raid_young_threshold=0)
+
+    for i in range(10):
+        guard.record_join(i % 2, settings, 1000 + i * 0.1, 400, FakeMember(i))
+
+    assert not guard.is_active(0)
+    assert not guard.is_active(1)
+
+
+def test_bot_is_not_started_on_import():
+    assert not bot.bot.is_ready()
@@ -0,0 +1,70 @@
+from types import SimpleNamespace
+
+import bot
+from bot import SearchIndex
+
+
+def make_index():
+    index = SearchIndex()
+    ids = {
+        "spam": index.add("deleted", 1, 10, (100,), "Buy cheap nitro here", "Buy cheap nitro here"),
+        "edit": index.add("edited", 1, 11, (100,), "hello there hello world", "hello there → hello world"),
+        "other": index.add("deleted", 1, 12, (200,), "free nitro link", "free nitro link"),
+        "ban": index.add("ban", 1, None, (200, 300), "spammer mod posting nitro links", "spammer banned by mod"),
+        "elsewhere": index.add("deleted", 2, 20, (100,), "nitro", "nitro"),
+    }
+    return index, ids
+
+
+def found(results):
+    return {document["id"] for document in results[0]}
+
+
+def test_search_by_term_stays_in_guild():
+    index, ids = make_index()
+    assert found(index.search(1, text="nitro")) == {ids["spam"], ids["other"], ids["ban"]}
+    assert found(index.search(2, text="nitro")) == {ids["elsewhere"]}
+
+
+def test_search_by_user_and_terms():
+    index, ids = make_index()
+    assert found(index.search(1, user_id=100)) == {ids["spam"], ids["edit"]}
+    assert found(index.search(1, user_id=100, text="NITRO")) == {ids["spam"]}
+    assert found(index.search(1, user_id=300)) == {ids["ban"]}
+    assert found(index.search(1, user_id=100, text="nitro missing")) == set()
+
+
+def test_search_by_kind_and_limit():
+    index, ids = make_index()
+    assert found(index.search(1, text="nitro", kind="ban")) == {ids["ban"]}
+
+    results, total = index.search(1, text="nitro", limit=2)
+    assert total == 3
+    assert len(results) == 2
+
+
+def test_remove_drops_empty_postings():
+    index, ids = make_index()
+    index.remove(ids["spam"])
+    index.remove(ids["spam"])
+
+    assert found(index.search(1, user_id=100, text="nitro")) == set()
+    assert "cheap" not in index.by_token
+    assert ids["spam"] not in index.documents
+
+
+def test_ban_log_evicts_its_index_entries(monkeypatch):
+    index = SearchIndex()
+    monkeypatch.setattr(bot, "search_index", index)
+    staff = bot.StaffCommands(bot.bot)
+    guild = SimpleNamespace(id=5)
+    moderator = SimpleNamespace(id=1, name="mod")
+
+    for i in range(bot.BAN_LOG_LIMIT + 3):
+        staff.log_ban(SimpleNamespace(id=100 + i, name=f"user{i}", guild=guild), moderator, "spam")
+
+    assert len(staff.ban_logs) == bot.BAN_LOG_LIMIT
+    assert len(index.documents) == bot.BAN_LOG_LIMIT
+    assert index.search(5, user_id=100)[1] == 0
+    assert index.search(5, user_id=100 + bot.BAN_LOG_LIMIT + 2)[1] == 1
+    assert index.search(5, text="spam")[1] == bot.BAN_LOG_LIMIT